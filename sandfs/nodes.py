@@ -5,38 +5,83 @@ from __future__ import annotations
 import time
 from collections.abc import Iterator
 from dataclasses import dataclass, field
+from itertools import accumulate
 from pathlib import PurePosixPath
 from typing import TYPE_CHECKING
 
 from .exceptions import InvalidOperation, NodeExists, NodeNotFound, ProviderError
-from .policies import NodePolicy
+from .policies import NodePolicy, _intern
 from .providers import ContentProvider, DirectoryProvider, NodeContext, ProvidedNode
 
 if TYPE_CHECKING:  # pragma: no cover
     from .vfs import VirtualFileSystem
 
+_ROOT = PurePosixPath("/")
 
-@dataclass
+
+@dataclass(slots=True, init=False)
 class VirtualNode:
     """Base node stored inside the sandbox."""
 
+    # Fields only declare the slots; defaults live in the hand-written __init__.
     name: str
-    parent: "VirtualDirectory" | None = None
-    metadata: dict[str, object] = field(default_factory=dict)
-    policy: NodePolicy = field(default_factory=NodePolicy)
-    version: int = 0
-    created_at: float = field(default_factory=time.time)
-    modified_at: float = field(default_factory=time.time)
+    parent: "VirtualDirectory" | None
+    # None until first use; most nodes never carry metadata.
+    _metadata: dict[str, object] | None = field(repr=False)
+    policy: NodePolicy
+    version: int
+    created_at: float
+    modified_at: float
+
+    def __init__(
+        self,
+        name: str,
+        parent: "VirtualDirectory" | None = None,
+        metadata: dict[str, object] | None = None,
+        policy: NodePolicy | None = None,
+        version: int = 0,
+        created_at: float | None = None,
+        modified_at: float | None = None,
+    ) -> None:
+        # Hand-written so ``metadata=`` keeps working while the dict lives in a
+        # lazily allocated slot.
+        self.name = name
+        self.parent = parent
+        self._metadata = metadata
+        self.policy = policy if policy is not None else NodePolicy()
+        self.version = version
+        # At most one clock reading; callers such as the VFS pass their own.
+        now = created_at if created_at is not None else modified_at
+        if now is None:
+            now = time.time()
+        self.created_at = now if created_at is None else created_at
+        self.modified_at = now if modified_at is None else modified_at
+
+    @property
+    def metadata(self) -> dict[str, object]:
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: dict[str, object]) -> None:
+        self._metadata = value
 
     def path(self) -> PurePosixPath:
         if self.parent is None:
-            return PurePosixPath("/")
+            return _ROOT
+        return PurePosixPath(self.path_str())
+
+    def path_str(self) -> str:
+        """Return the absolute path as a plain string, skipping ``PurePosixPath``."""
+        if self.parent is None:
+            return "/"
         segments = []
         node: VirtualNode | None = self
         while node and node.parent is not None:
             segments.append(node.name)
             node = node.parent
-        return PurePosixPath("/" + "/".join(reversed(segments))) if segments else PurePosixPath("/")
+        return "/" + "/".join(reversed(segments))
 
     def build_context(self, vfs: "VirtualFileSystem" | None = None) -> NodeContext:
         return NodeContext(path=self.path(), metadata=self.metadata, vfs=vfs)
@@ -45,6 +90,8 @@ class VirtualNode:
 class VirtualFile(VirtualNode):
     """Represents a file backed by either static text or a provider."""
 
+    __slots__ = ("_content", "_provider", "_line_offsets")
+
     def __init__(
         self,
         name: str,
@@ -53,10 +100,18 @@ class VirtualFile(VirtualNode):
         content: str | None = None,
         provider: ContentProvider | None = None,
         metadata: dict[str, object] | None = None,
+        created_at: float | None = None,
     ) -> None:
-        super().__init__(name=name, parent=parent, metadata=dict(metadata or {}))
+        super().__init__(
+            name=name,
+            parent=parent,
+            metadata=dict(metadata) if metadata else None,
+            created_at=created_at,
+        )
         self._content = content or ""
         self._provider = provider
+        # Start offset of every line in static content, built on first tail read.
+        self._line_offsets: list[int] | None = None
 
     def read(self, vfs: "VirtualFileSystem" | None = None) -> str:
         if self._provider is None:
@@ -67,20 +122,35 @@ class VirtualFile(VirtualNode):
         except Exception as exc:  # pragma: no cover - rewrap provider failures
             raise ProviderError(str(exc)) from exc
 
+    def read_tail_lines(self, count: int, vfs: "VirtualFileSystem" | None = None) -> str:
+        """Return the last ``count`` lines, as ``splitlines(keepends=True)[-count:]``."""
+        if self._provider is not None:
+            return "".join(self.read(vfs).splitlines(keepends=True)[-count:])
+        offsets = self._line_offsets
+        if offsets is None:
+            lines = self._content.splitlines(keepends=True)
+            offsets = self._line_offsets = list(accumulate(map(len, lines), initial=0))
+        start = slice(-count, None).indices(len(offsets) - 1)[0]
+        return self._content[offsets[start] :]
+
     def write(self, data: str, *, append: bool = False) -> None:
         if append:
             self._content += data
         else:
             self._content = data
         self._provider = None
+        self._line_offsets = None
 
     def set_provider(self, provider: ContentProvider) -> None:
         self._provider = provider
+        self._line_offsets = None
 
 
 class VirtualDirectory(VirtualNode):
     """Directories store children lazily when a loader is present."""
 
+    __slots__ = ("loader", "_loaded", "children")
+
     def __init__(
         self,
         name: str,
@@ -88,8 +158,14 @@ class VirtualDirectory(VirtualNode):
         parent: "VirtualDirectory" | None = None,
         loader: DirectoryProvider | None = None,
         metadata: dict[str, object] | None = None,
+        created_at: float | None = None,
     ) -> None:
-        super().__init__(name=name, parent=parent, metadata=dict(metadata or {}))
+        super().__init__(
+            name=name,
+            parent=parent,
+            metadata=dict(metadata) if metadata else None,
+            created_at=created_at,
+        )
         self.loader = loader
         self._loaded = loader is None
         self.children: dict[str, VirtualNode] = {}
@@ -110,13 +186,16 @@ class VirtualDirectory(VirtualNode):
 
     def add_child(self, node: VirtualNode) -> None:
         if node.name in self.children:
-            raise NodeExists(f"Node {node.name} already exists in {self.path()}")
+            raise NodeExists(f"Node {node.name} already exists in {self.path_str()}")
         node.parent = self
-        self.children[node.name] = node
+        # Interned so names repeated across the tree (README.md, __init__.py, ...)
+        # share one string object instead of one copy per node.
+        node.name = name = _intern(node.name)
+        self.children[name] = node
 
     def remove_child(self, name: str) -> None:
         if name not in self.children:
-            raise NodeNotFound(f"Child {name} not found in {self.path()}")
+            raise NodeNotFound(f"Child {name} not found in {self.path_str()}")
         del self.children[name]
 
     def get_child(self, name: str, vfs: "VirtualFileSystem" | None = None) -> VirtualNode:
@@ -124,7 +203,7 @@ class VirtualDirectory(VirtualNode):
         try:
             return self.children[name]
         except KeyError as exc:
-            raise NodeNotFound(f"Child {name} not found in {self.path()}") from exc
+            raise NodeNotFound(f"Child {name} not found in {self.path_str()}") from exc
 
     def iter_children(self, vfs: "VirtualFileSystem" | None = None) -> Iterator[VirtualNode]:
         self.ensure_loaded(vfs)
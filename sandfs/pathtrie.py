@@ -0,0 +1,103 @@
+"""Prefix trie used to route paths to storage mounts and hooks."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import PurePosixPath
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _TrieNode(Generic[T]):
+    __slots__ = ("children", "values")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode[T]] = {}
+        self.values: list[tuple[int, T]] = []
+
+
+class PathTrie(Generic[T]):
+    """Maps absolute path prefixes to values.
+
+    Lookups descend one segment at a time, so routing a path costs O(depth)
+    no matter how many prefixes are registered. Values keep their
+    registration order across prefixes.
+    """
+
+    def __init__(self) -> None:
+        self._root: _TrieNode[T] = _TrieNode()
+        self._seq = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _node(self, prefix: PurePosixPath) -> _TrieNode[T]:
+        node = self._root
+        for part in prefix.parts[1:]:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _TrieNode()
+            node = child
+        return node
+
+    def add(self, prefix: PurePosixPath, value: T) -> None:
+        """Register another value under ``prefix``."""
+        self._node(prefix).values.append((self._seq, value))
+        self._seq += 1
+        self._size += 1
+
+    def set(self, prefix: PurePosixPath, value: T) -> None:
+        """Make ``value`` the only value registered under ``prefix``."""
+        node = self._node(prefix)
+        self._size += 1 - len(node.values)
+        node.values = [(self._seq, value)]
+        self._seq += 1
+
+    def _walk(self, path: PurePosixPath) -> Iterator[tuple[int, _TrieNode[T]]]:
+        node = self._root
+        yield (1, node)
+        parts = path.parts
+        for depth in range(1, len(parts)):
+            child = node.children.get(parts[depth])
+            if child is None:
+                return
+            node = child
+            yield (depth + 1, node)
+
+    def matches(self, path: PurePosixPath) -> list[T]:
+        """Return every value whose prefix contains ``path``, in registration order."""
+        found = [entry for _, node in self._walk(path) for entry in node.values]
+        if len(found) > 1:
+            found.sort(key=lambda entry: entry[0])
+        return [value for _, value in found]
+
+    def overlaps(self, path: PurePosixPath) -> bool:
+        """Return True if a registered prefix contains ``path`` or lies beneath it."""
+        if not self._size:
+            return False
+        node = self._root
+        for part in path.parts[1:]:
+            if node.values:
+                return True
+            child = node.children.get(part)
+            if child is None:
+                return False
+            node = child
+        # Every node in the trie sits on the way to at least one registered prefix.
+        return True
+
+    def longest(self, path: PurePosixPath) -> tuple[PurePosixPath, T] | None:
+        """Return the most specific prefix containing ``path`` and its latest value."""
+        best: tuple[int, T] | None = None
+        for depth, node in self._walk(path):
+            if node.values:
+                best = (depth, node.values[-1][1])
+        if best is None:
+            return None
+        depth, value = best
+        return PurePosixPath(*path.parts[:depth]), value
+
+
+__all__ = ["PathTrie"]
@@ -2,27 +2,99 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable, Mapping
+import sys
+from collections.abc import Iterable, Iterator, Mapping
+from collections.abc import Set as AbstractSet
 from dataclasses import dataclass, field
+from itertools import count
 from pathlib import PurePosixPath
+from types import MappingProxyType
 from typing import TYPE_CHECKING
 
+from .pathtrie import PathTrie
+
 if TYPE_CHECKING:  # pragma: no cover
     from .nodes import VirtualNode
 
 
-@dataclass
+_POLICY_READ = 0x1
+_POLICY_WRITE = 0x2
+_POLICY_APPEND_ONLY = 0x4
+
+# Every classification or principal label seen gets its own bit, so visibility
+# checks AND two ints instead of probing sets. Bits come from a shared counter,
+# so two labels never share one even when registered from different threads.
+# The registry is process-wide and never forgets a label, so it is capped: once
+# full, new labels share the overflow bit and a match on that bit alone is
+# confirmed against the label sets themselves.
+_MAX_LABEL_BITS = 1024
+_OVERFLOW_BIT = 1
+_LABEL_BITS: dict[str, int] = {}
+_LABEL_SEQ = count(1)
+
+
+# Read-only stand-in for nodes that have never been given metadata.
+_NO_METADATA: Mapping[str, object] = MappingProxyType({})
+
+
+def _intern(label: str) -> str:
+    # Only exact str can be interned; subclasses such as StrEnum members pass through.
+    return sys.intern(label) if type(label) is str else label
+
+
+def _label_bit(label: str) -> int:
+    bit = _LABEL_BITS.get(label)
+    if bit is None:
+        if len(_LABEL_BITS) >= _MAX_LABEL_BITS:
+            return _OVERFLOW_BIT
+        bit = _LABEL_BITS.setdefault(label, 1 << next(_LABEL_SEQ))
+    return bit
+
+
+def _label_mask(labels: Iterable[str]) -> int:
+    mask = 0
+    for label in labels:
+        mask |= _label_bit(label)
+    return mask
+
+
+@dataclass(slots=True, frozen=True)
 class NodePolicy:
-    """Controls access, write semantics, and visibility for a node."""
+    """Controls access, write semantics, and visibility for a node.
+
+    Policies are immutable; use :func:`dataclasses.replace` and
+    ``VirtualFileSystem.set_policy`` to change a node's policy.
+    """
 
     readable: bool = True
     writable: bool = True
     append_only: bool = False
     classification: str = "public"
-    principals: set[str] = field(default_factory=set)
+    principals: AbstractSet[str] = frozenset()
+    _bits: int = field(init=False, repr=False, compare=False)
+    _principal_mask: int = field(init=False, repr=False, compare=False)
+    _classification_bit: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Labels are interned so policies built from parsed data share one
+        # string per label; frozen principals let clones share the set.
+        object.__setattr__(self, "classification", _intern(self.classification))
+        object.__setattr__(self, "principals", frozenset(map(_intern, self.principals)))
+        # Access flags folded into one int so permission checks are a single `&`.
+        object.__setattr__(self, "_bits", self._compute_bits())
+        # Labels folded the same way, so visibility checks AND two ints.
+        object.__setattr__(self, "_principal_mask", _label_mask(self.principals))
+        object.__setattr__(self, "_classification_bit", _label_bit(self.classification))
 
+    def _compute_bits(self) -> int:
+        return (
+            (_POLICY_READ if self.readable else 0)
+            | (_POLICY_WRITE if self.writable else 0)
+            | (_POLICY_APPEND_ONLY if self.append_only else 0)
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(slots=True, frozen=True)
 class VisibilityView:
     """Filters nodes by classification labels and principals."""
 
@@ -30,6 +102,11 @@ class VisibilityView:
     principals: frozenset[str] | None = None
     path_prefixes: frozenset[PurePosixPath] | None = None
     metadata_filters: Mapping[str, object] | None = None
+    _prefix_trie: PathTrie[None] = field(init=False, repr=False, compare=False)
+    _principal_mask: int = field(init=False, repr=False, compare=False)
+    _classification_mask: int = field(init=False, repr=False, compare=False)
+    _metadata_items: tuple[tuple[str, object], ...] = field(init=False, repr=False, compare=False)
+    _metadata_min_keys: int = field(init=False, repr=False, compare=False)
 
     def __init__(
         self,
@@ -41,12 +118,12 @@ class VisibilityView:
         object.__setattr__(
             self,
             "classifications",
-            frozenset(classifications) if classifications is not None else None,
+            frozenset(map(_intern, classifications)) if classifications is not None else None,
         )
         object.__setattr__(
             self,
             "principals",
-            frozenset(principals) if principals is not None else None,
+            frozenset(map(_intern, principals)) if principals is not None else None,
         )
         object.__setattr__(
             self,
@@ -55,36 +132,93 @@ class VisibilityView:
             if path_prefixes is not None
             else None,
         )
+        # Prefix checks walk one trie per view instead of comparing every prefix.
+        prefix_trie: PathTrie[None] = PathTrie()
+        for prefix in self.path_prefixes or ():
+            # Relative prefixes never match an absolute node path.
+            if prefix.is_absolute():
+                prefix_trie.add(prefix, None)
+        object.__setattr__(self, "_prefix_trie", prefix_trie)
+        object.__setattr__(self, "_principal_mask", _label_mask(self.principals or ()))
+        object.__setattr__(self, "_classification_mask", _label_mask(self.classifications or ()))
         object.__setattr__(
             self,
             "metadata_filters",
             dict(metadata_filters) if metadata_filters is not None else None,
         )
+        # A filter on a non-None value needs that key present, so nodes with
+        # fewer metadata keys than this can be rejected without any lookups.
+        # Filters frozen to a tuple so each check iterates it without dict views.
+        metadata_items = tuple((self.metadata_filters or {}).items())
+        object.__setattr__(self, "_metadata_items", metadata_items)
+        object.__setattr__(
+            self,
+            "_metadata_min_keys",
+            sum(value is not None for _, value in metadata_items),
+        )
 
     def allows(self, policy: NodePolicy) -> bool:
-        if policy.principals:
+        if policy._principal_mask:
             if self.principals is None:
                 return False
-            if not (policy.principals & self.principals):
-                return False
-            return True
+            shared = policy._principal_mask & self._principal_mask
+            if shared == _OVERFLOW_BIT:
+                return not policy.principals.isdisjoint(self.principals)
+            return bool(shared)
         if self.classifications is None:
             return True
-        return policy.classification in self.classifications
+        shared = policy._classification_bit & self._classification_mask
+        if shared == _OVERFLOW_BIT:
+            return policy.classification in self.classifications
+        return bool(shared)
+
+    def _allowed_nodes(self, nodes: Iterable["VirtualNode"]) -> Iterator["VirtualNode"]:
+        # allows() over a batch of nodes with the view's masks bound once. When
+        # the view has no principals its mask is 0, which rejects every
+        # principal-scoped policy, as allows() does.
+        principal_mask = self._principal_mask
+        classification_mask = self._classification_mask
+        any_classification = self.classifications is None
+        for node in nodes:
+            policy = node.policy
+            if policy._principal_mask:
+                shared = policy._principal_mask & principal_mask
+            elif any_classification:
+                yield node
+                continue
+            else:
+                shared = policy._classification_bit & classification_mask
+            if shared == _OVERFLOW_BIT:
+                # Only overflow labels in common: settle it with the label sets.
+                if self.allows(policy):
+                    yield node
+            elif shared:
+                yield node
+
+    def allows_path(self, path: PurePosixPath) -> bool:
+        """True if ``path`` lies under a visible prefix or leads to one."""
+        if self.path_prefixes is None:
+            return True
+        return self._prefix_trie.overlaps(path)
+
+    def _covers_path(self, path: PurePosixPath) -> bool:
+        # True when everything beneath ``path`` passes the prefix check.
+        return self.path_prefixes is None or self._prefix_trie.longest(path) is not None
 
     def allows_node(self, node: "VirtualNode") -> bool:
         if not self.allows(node.policy):
             return False
-        if self.path_prefixes is not None:
-            node_path = node.path()
-            if not any(
-                node_path.is_relative_to(prefix) or prefix.is_relative_to(node_path)
-                for prefix in self.path_prefixes
-            ):
-                return False
+        if self.path_prefixes is not None and not self._prefix_trie.overlaps(node.path()):
+            return False
+        return self._matches_metadata(node)
+
+    def _matches_metadata(self, node: "VirtualNode") -> bool:
         if self.metadata_filters is not None:
-            for key, value in self.metadata_filters.items():
-                if node.metadata.get(key) != value:
+            metadata = node._metadata or _NO_METADATA
+            if len(metadata) < self._metadata_min_keys:
+                return False
+            for key, value in self._metadata_items:
+                if metadata.get(key) != value:
                     return False
         return True
 
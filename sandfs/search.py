@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import functools
 import re
 from dataclasses import dataclass
 from pathlib import PurePosixPath
@@ -23,32 +24,89 @@ class SearchResult:
     line_text: str
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern: str, flags: int) -> re.Pattern[str]:
+    return re.compile(pattern, flags)
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
 class FullTextIndex:
     def __init__(self) -> None:
         self._files: dict[PurePosixPath, str] = {}
+        # Lowercased trigram postings used to narrow literal searches. They are
+        # refreshed lazily at search time, so writes only mark files as stale.
+        self._postings: dict[str, set[PurePosixPath]] = {}
+        self._file_grams: dict[PurePosixPath, set[str]] = {}
+        self._stale: set[PurePosixPath] = set()
 
     def clear(self) -> None:
         self._files.clear()
+        self._postings.clear()
+        self._file_grams.clear()
+        self._stale.clear()
 
     def build(self, entries: Iterable[tuple[PurePosixPath, str]]) -> None:
-        self._files.clear()
+        self.clear()
         for path, content in entries:
             self._files[path] = content
+            self._stale.add(path)
 
     def index_file(self, path: PurePosixPath, content: str) -> None:
         self._files[path] = content
+        self._stale.add(path)
 
     def remove_file(self, path: PurePosixPath) -> None:
         self._files.pop(path, None)
+        self._stale.discard(path)
+        self._drop_grams(path)
+
+    def _drop_grams(self, path: PurePosixPath) -> None:
+        for gram in self._file_grams.pop(path, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(path)
+                if not posting:
+                    del self._postings[gram]
+
+    def _refresh_grams(self) -> None:
+        for path in self._stale:
+            self._drop_grams(path)
+            grams = _trigrams(self._files[path].lower())
+            self._file_grams[path] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(path)
+        self._stale.clear()
+
+    def _candidates(self, needle: str) -> set[PurePosixPath] | None:
+        # Only ASCII needles: their lowercase form maps character for character,
+        # so every file containing the needle is guaranteed to hold its trigrams.
+        if len(needle) < 3 or not needle.isascii():
+            return None
+        self._refresh_grams()
+        postings = sorted(
+            (self._postings.get(gram, set()) for gram in _trigrams(needle.lower())), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+        return candidates
 
     def search(self, query: SearchQuery) -> list[SearchResult]:
         results: list[SearchResult] = []
         flags = re.MULTILINE
         if query.ignore_case:
             flags |= re.IGNORECASE
-        compiled = re.compile(query.query, flags) if query.regex else None
+        compiled = _compile_pattern(query.query, flags) if query.regex else None
         lowered = query.query.lower() if query.ignore_case and not query.regex else None
+        candidates = None if query.regex else self._candidates(query.query)
         for path, content in self._files.items():
+            if candidates is not None and path not in candidates:
+                continue
             if query.path_prefix and not path.is_relative_to(query.path_prefix):
                 continue
             for line_no, line in enumerate(content.splitlines(), start=1):
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import contextlib
-import fnmatch
+import functools
 import inspect
 import os
 import re
@@ -14,22 +14,40 @@ from datetime import datetime
 from pathlib import Path, PurePosixPath
 
 from .exceptions import InvalidOperation, NodeNotFound, SandboxError
-from .nodes import VirtualDirectory, VirtualFile, VirtualNode
-from .policies import VisibilityView
+from .nodes import VirtualDirectory, VirtualFile
+from .policies import _NO_METADATA, VisibilityView
 from .pyexec import PythonExecutor
-from .search import SearchQuery
-from .shell_parser import parse_pipeline
+from .search import SearchQuery, _compile_pattern
+from .shell_parser import Pipeline, parse_pipeline
 from .vfs import DirEntry, VirtualFileSystem
 
+# Agents and scripts repeat the same command lines; parsing is pure, so cache it.
+# Cached pipelines are shared between calls and must be treated as read-only.
+_parse_pipeline_cached = functools.lru_cache(maxsize=512)(parse_pipeline)
 
-@dataclass
+_HIDDEN_MESSAGE = "Path %s is hidden for this view"
+
+_VAR_RE = re.compile(r"\$(\w+)|\${([^}]+)}")
+_SANDBOX_PATH_RE = re.compile(r"/[A-Za-z0-9._/\-]+")
+
+
+def _script_lines(commands: Iterable[str]) -> Iterator[str]:
+    # exec() and exec_script() share one notion of a command line.
+    for command in commands:
+        for line in command.splitlines():
+            line = line.strip()
+            if line:
+                yield line
+
+
+@dataclass(slots=True)
 class CommandResult:
     stdout: str = ""
     stderr: str = ""
     exit_code: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class CommandContext:
     stdin: str
     env: dict[str, str]
@@ -101,25 +119,27 @@ class SandboxShell:
         return sorted(self.commands)
 
     def _ensure_visible_path(self, path: str) -> None:
+        if not self._is_visible_path(path):
+            raise InvalidOperation(_HIDDEN_MESSAGE % path)
+
+    def _is_visible_path(self, path: str) -> bool:
+        # Boolean core of _ensure_visible_path, for callers that only need the
+        # verdict and would otherwise build and discard the error message.
         if self.view is None:
-            return
+            return True
         if self.view.path_prefixes is not None:
-            normalized = self.vfs._normalize(path)
-            if not any(
-                normalized.is_relative_to(prefix) or prefix.is_relative_to(normalized)
-                for prefix in self.view.path_prefixes
-            ):
-                raise InvalidOperation(f"Path {path} is hidden for this view")
+            if not self.view.allows_path(self.vfs._normalize(path)):
+                return False
         try:
             node = self.vfs.get_node(path)
         except NodeNotFound:
-            return
+            return True
         if not self.view.allows(node.policy):
-            raise InvalidOperation(f"Path {path} is hidden for this view")
+            return False
         if self.view.metadata_filters and isinstance(node, VirtualDirectory):
-            return
-        if not self.view.allows_node(node):
-            raise InvalidOperation(f"Path {path} is hidden for this view")
+            return True
+        # Policy and prefix were checked above; only the metadata filters remain.
+        return self.view._matches_metadata(node)
 
     def _enforce_output_limit(self, result: CommandResult) -> CommandResult:
         if self.max_output_bytes is None:
@@ -200,7 +220,7 @@ class SandboxShell:
                 rendered = f"{rendered}/"
             return rendered
 
-        return re.sub(r"/[A-Za-z0-9._/\-]+", replacer, token)
+        return _SANDBOX_PATH_RE.sub(replacer, token)
 
     def _eligible_sandbox_path(self, path_str: str) -> PurePosixPath | None:
         try:
@@ -217,33 +237,36 @@ class SandboxShell:
         return None
 
     def _sync_from_host(self, fs_root: Path) -> None:
-        host_dirs: set[PurePosixPath] = set()
-        host_files: set[PurePosixPath] = set()
-        for path in sorted(fs_root.rglob("*")):
-            sandbox_path = PurePosixPath("/").joinpath(*path.relative_to(fs_root).parts)
-            if path.is_dir():
-                host_dirs.add(sandbox_path)
-                if sandbox_path != PurePosixPath("/"):
-                    self.vfs.mkdir(sandbox_path, parents=True, exist_ok=True)
-                continue
-            host_files.add(sandbox_path)
-            try:
-                text = path.read_text()
-            except UnicodeDecodeError:
-                text = path.read_bytes().decode(errors="ignore")
-            self.vfs.mkdir(sandbox_path.parent, parents=True, exist_ok=True)
-            should_write = True
-            if self.vfs.is_file(sandbox_path):
+        # Pull host changes back in one batch so storage writes and hooks are
+        # flushed together once the tree matches the host again.
+        with self.vfs.batch():
+            host_dirs: set[PurePosixPath] = set()
+            host_files: set[PurePosixPath] = set()
+            for path in sorted(fs_root.rglob("*")):
+                sandbox_path = PurePosixPath("/").joinpath(*path.relative_to(fs_root).parts)
+                if path.is_dir():
+                    host_dirs.add(sandbox_path)
+                    if sandbox_path != PurePosixPath("/"):
+                        self.vfs.mkdir(sandbox_path, parents=True, exist_ok=True)
+                    continue
+                host_files.add(sandbox_path)
                 try:
-                    existing = self.vfs.read_file(sandbox_path)
-                except InvalidOperation:
-                    existing = None
-                else:
-                    if existing == text:
-                        should_write = False
-            if should_write:
-                self.vfs.write_file(sandbox_path, text)
-        self._remove_missing(host_dirs, host_files)
+                    text = path.read_text()
+                except UnicodeDecodeError:
+                    text = path.read_bytes().decode(errors="ignore")
+                self.vfs.mkdir(sandbox_path.parent, parents=True, exist_ok=True)
+                should_write = True
+                if self.vfs.is_file(sandbox_path):
+                    try:
+                        existing = self.vfs.read_file(sandbox_path)
+                    except InvalidOperation:
+                        existing = None
+                    else:
+                        if existing == text:
+                            should_write = False
+                if should_write:
+                    self.vfs.write_file(sandbox_path, text)
+            self._remove_missing(host_dirs, host_files)
 
     def _remove_missing(
         self,
@@ -272,19 +295,48 @@ class SandboxShell:
     # ------------------------------------------------------------------
     def exec(self, command: str) -> CommandResult:
         last_result = CommandResult()
-        for segment in filter(None, (line.strip() for line in command.splitlines())):
+        for segment in _script_lines((command,)):
             last_result = self._exec_pipeline(segment)
             if last_result.exit_code != 0:
                 return last_result
         return last_result
 
-    def _exec_pipeline(self, command: str) -> CommandResult:
-        if not command.strip():
+    def exec_script(
+        self, commands: Iterable[str], *, stop_on_error: bool = True
+    ) -> list[CommandResult]:
+        """Run several command lines and return one result per line that ran.
+
+        Entries are split into lines and blank lines skipped, as :meth:`exec`
+        does. Every line is parsed before the first one executes. With
+        ``stop_on_error`` the script stops after the first non-zero exit.
+        """
+        parsed = [self._parse(line) for line in _script_lines(commands)]
+        results: list[CommandResult] = []
+        for pipeline in parsed:
+            if isinstance(pipeline, CommandResult):
+                result = pipeline
+            else:
+                result = self._run_pipeline(pipeline)
+            results.append(result)
+            if stop_on_error and result.exit_code != 0:
+                break
+        return results
+
+    def _parse(self, command: str) -> Pipeline | CommandResult:
+        if not command:
             return CommandResult()
         try:
-            pipeline = parse_pipeline(command)
+            return _parse_pipeline_cached(command)
         except ValueError as exc:
             return CommandResult(stderr=str(exc), exit_code=2)
+
+    def _exec_pipeline(self, command: str) -> CommandResult:
+        pipeline = self._parse(command)
+        if isinstance(pipeline, CommandResult):
+            return pipeline
+        return self._run_pipeline(pipeline)
+
+    def _run_pipeline(self, pipeline: Pipeline) -> CommandResult:
         if not pipeline.commands:
             return CommandResult()
 
@@ -367,7 +419,8 @@ class SandboxShell:
         return self._enforce_output_limit(CommandResult(stdout=str(result)))
 
     def _expand_vars(self, token: str, env: dict[str, str]) -> str:
-        pattern = re.compile(r"\$(\w+)|\${([^}]+)}")
+        if "$" not in token:
+            return token
 
         def replacer(match: re.Match[str]) -> str:
             name = match.group(1) or match.group(2)
@@ -375,7 +428,7 @@ class SandboxShell:
                 return ""
             return env.get(name, "")
 
-        return pattern.sub(replacer, token)
+        return _VAR_RE.sub(replacer, token)
 
     def _expand_args(self, args: list[str], env: dict[str, str], *, command_name: str) -> list[str]:
         expanded: list[str] = []
@@ -569,13 +622,13 @@ class SandboxShell:
                     if not node.policy.readable:
                         raise InvalidOperation(f"{node.path()} is not readable") from None
                     if self.view and not self.view.allows_node(node):
-                        raise InvalidOperation(f"Path {resolved} is hidden for this view") from None
+                        raise InvalidOperation(_HIDDEN_MESSAGE % resolved) from None
                     entries = [
                         DirEntry(
                             name=node.name,
                             path=node.path(),
                             is_dir=False,
-                            metadata=node.metadata,
+                            metadata=node._metadata if node._metadata is not None else _NO_METADATA,
                             policy=node.policy,
                         )
                     ]
@@ -948,7 +1001,7 @@ class SandboxShell:
         flags = re.MULTILINE
         if ignore_case:
             flags |= re.IGNORECASE
-        compiled = re.compile(pattern, flags) if regex else None
+        compiled = _compile_pattern(pattern, flags) if regex else None
         lowered = pattern.lower() if ignore_case and not regex else None
         for target in paths:
             for file_path, file_node in self.vfs.iter_files(target, recursive=recursive):
@@ -985,7 +1038,7 @@ class SandboxShell:
         flags = re.MULTILINE
         if ignore_case:
             flags |= re.IGNORECASE
-        compiled = re.compile(pattern, flags) if regex else None
+        compiled = _compile_pattern(pattern, flags) if regex else None
         lowered = pattern.lower() if ignore_case and not regex else None
         for idx, line in enumerate(text.splitlines(), start=1):
             matched = False
@@ -1221,22 +1274,27 @@ class SandboxShell:
         for i, path in enumerate(paths):
             if path == "-":
                 content = ctx.stdin if ctx else ""
+                if mode == "lines":
+                    content = "".join(content.splitlines(keepends=True)[-count:])
+                else:
+                    content = content[-count:]
             else:
                 with self._maybe_search_context(path) as resolved:
                     self._ensure_visible_path(resolved)
                     try:
-                        content = self.vfs.read_file(resolved)
+                        if mode == "lines":
+                            # Line offsets are cached on the node, so repeated
+                            # tails of a large file skip re-splitting it.
+                            content = self.vfs.read_tail_lines(resolved, count)
+                        else:
+                            content = self.vfs.read_file(resolved)[-count:]
                     except (NodeNotFound, InvalidOperation) as exc:
                         return CommandResult(stderr=str(exc), exit_code=1)
 
             if len(paths) > 1:
                 output.append(f"==> {path} <==")
 
-            if mode == "lines":
-                lines = content.splitlines(keepends=True)
-                output.append("".join(lines[-count:]))
-            else:
-                output.append(content[-count:])
+            output.append(content)
 
             if i < len(paths) - 1:
                 output.append("")
@@ -1282,40 +1340,25 @@ class SandboxShell:
         if not paths:
             paths = [self.vfs.pwd()]
 
-        def walk_visible(node: VirtualNode) -> Iterable[tuple[PurePosixPath, VirtualNode]]:
-            if self.view and not self.view.allows_node(node):
-                return
-            yield (node.path(), node)
-            if isinstance(node, VirtualDirectory):
-                node.ensure_loaded(self.vfs)
-                for child in node.iter_children(self.vfs):
-                    yield from walk_visible(child)
-
         results: list[str] = []
         for start_path in paths:
             try:
                 with self._maybe_search_context(start_path) as resolved:
                     self._ensure_visible_path(resolved)
-                    start_node = self.vfs.get_node(resolved)
+                    results.extend(
+                        self.vfs.find(
+                            resolved,
+                            name_pattern=name_pattern,
+                            node_type=type_filter,
+                            view=self.view,
+                        )
+                    )
             except (NodeNotFound, InvalidOperation):
                 return CommandResult(
                     stderr=f"find: `{start_path}': No such file or directory",
                     exit_code=1,
                 )
 
-            for path, node in walk_visible(start_node):
-                if type_filter:
-                    is_dir = isinstance(node, VirtualDirectory)
-                    if type_filter == "f" and is_dir:
-                        continue
-                    if type_filter == "d" and not is_dir:
-                        continue
-
-                if name_pattern and not fnmatch.fnmatch(node.name, name_pattern):
-                    continue
-
-                results.append(str(path))
-
         return CommandResult(stdout="\n".join(results))
 
 
@@ -4,33 +4,117 @@ from __future__ import annotations
 
 import contextlib
 import fnmatch
+import functools
+import os
 import re
 import tempfile
 import time
-from collections.abc import Iterable, Iterator, Mapping, MutableMapping
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path, PurePosixPath
 
-from .adapters import StorageAdapter
+from .adapters import StorageAdapter, StorageEntry
 from .exceptions import InvalidOperation, NodeExists, NodeNotFound
 from .hooks import WriteEvent, WriteHook
 from .integrations import PathEvent, PathHook
 from .nodes import VirtualDirectory, VirtualFile, VirtualNode
-from .policies import NodePolicy, VisibilityView
+from .pathtrie import PathTrie
+from .policies import (
+    _NO_METADATA,
+    _POLICY_APPEND_ONLY,
+    _POLICY_READ,
+    _POLICY_WRITE,
+    NodePolicy,
+    VisibilityView,
+)
 from .providers import ContentProvider, DirectoryProvider, NodeContext, ProvidedNode
-from .search import FullTextIndex, SearchQuery, SearchResult
+from .search import FullTextIndex, SearchQuery, SearchResult, _compile_pattern
 
+_ROOT = PurePosixPath("/")
+_ROOT_STR = "/"
+_MAX_SYNC_WORKERS = 8
+_MAX_EXPORT_WORKERS = 32
+_PARALLEL_EXPORT_MIN_FILES = 32
+_RESOLVE_CACHE_SIZE = 4096
 
-@dataclass
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_absolute(path: str) -> PurePosixPath:
+    parts: list[str] = []
+    for part in path.split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if parts:
+                parts.pop()
+            continue
+        parts.append(part)
+    return PurePosixPath("/" + "/".join(parts)) if parts else _ROOT
+
+
+def _is_plain_name(path: str | PurePosixPath) -> bool:
+    return isinstance(path, str) and "/" not in path and path not in ("", ".", "..")
+
+
+def _join_path(parent: str, name: str) -> str:
+    return f"/{name}" if parent == _ROOT_STR else f"{parent}/{name}"
+
+
+def _path_depth(path_str: str) -> int:
+    # Canonical absolute keys: the slash count is the depth, except that the
+    # root ("/") must rank above its children ("/a") rather than tie with them.
+    return 0 if path_str == _ROOT_STR else path_str.count("/")
+
+
+def _snapshot_order(item: tuple[str, NodeSnapshot]) -> int:
+    return _path_depth(item[0])
+
+
+def _restore_missing_parents(
+    directories: dict[str, VirtualDirectory], path_str: str
+) -> VirtualDirectory:
+    # Hand-built snapshots may omit intermediate directories; create them as
+    # plain directories from the deepest known ancestor down.
+    missing: list[str] = []
+    while path_str not in directories:
+        missing.append(path_str)
+        path_str = path_str.rpartition("/")[0] or _ROOT_STR
+    parent = directories[path_str]
+    for missing_str in reversed(missing):
+        child = VirtualDirectory(name=missing_str.rpartition("/")[2], parent=parent)
+        parent.add_child(child)
+        directories[missing_str] = parent = child
+    return parent
+
+
+def _write_if_changed(target: Path, data: bytes) -> None:
+    if not _file_matches(target, data):
+        target.write_bytes(data)
+
+
+def _file_matches(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        existing = path.read_bytes()
+    except OSError:
+        return False
+    return existing == data
+
+
+@dataclass(slots=True, frozen=True)
 class DirEntry:
     name: str
     path: PurePosixPath
     is_dir: bool
-    metadata: dict[str, object]
+    # Nodes without metadata share one read-only empty mapping.
+    metadata: Mapping[str, object]
     policy: NodePolicy
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NodeSnapshot:
     is_dir: bool
     metadata: dict[str, object]
@@ -41,7 +125,7 @@ class NodeSnapshot:
     content: str | None = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class VFSSnapshot:
     nodes: dict[str, NodeSnapshot]
     cwd: PurePosixPath
@@ -54,41 +138,59 @@ class SearchViewContext:
     view: VisibilityView | None
 
 
+@dataclass(slots=True, frozen=True)
+class _PendingOp:
+    """A storage/hook side effect deferred by ``VirtualFileSystem.batch()``."""
+
+    node: VirtualFile
+    path: PurePosixPath
+    event_type: str
+    content: str | None = None
+    previous_version: int = 0
+    version: int = 0
+    append: bool = False
+
+
 class VirtualFileSystem:
     """In-memory filesystem that supports dynamic nodes."""
 
     def __init__(self) -> None:
         self.root = VirtualDirectory(name="")
         self.cwd = self.root
-        self._write_hooks: list[tuple[PurePosixPath, WriteHook]] = []
+        # Hooks and mounts are routed through prefix tries so dispatch costs
+        # O(path depth) however many are registered.
+        self._write_hooks: PathTrie[WriteHook] = PathTrie()
         self._storage_mounts: dict[PurePosixPath, StorageAdapter] = {}
-        self._path_hooks: list[tuple[PurePosixPath, PathHook]] = []
+        self._mount_trie: PathTrie[StorageAdapter] = PathTrie()
+        self._path_hooks: PathTrie[PathHook] = PathTrie()
         self._full_text_index: FullTextIndex | None = None
         self._search_view_prefix: PurePosixPath | None = None
         self._search_view_context: SearchViewContext | None = None
+        self._resolve_cache: dict[str, VirtualNode] = {}
+        # Bumped whenever nodes are added, removed or re-labelled; derived indexes
+        # remember the epoch they were built at and rebuild lazily once it moves.
+        self._tree_epoch = 0
+        self._classification_index: tuple[int, dict[str, list[str]]] | None = None
+        self._batch: list[_PendingOp] | None = None
+        # Swappable so tests can drive timestamps; a batch pins one reading.
+        self._clock: Callable[[], float] = time.time
+        self._batch_now: float | None = None
 
     # ------------------------------------------------------------------
     # Path helpers
     # ------------------------------------------------------------------
     def _normalize(self, path: str | PurePosixPath | None) -> PurePosixPath:
         if path is None or str(path) == "":
-            base = self.cwd.path()
-            raw = base
-        else:
-            raw = PurePosixPath(path)
-            if not raw.is_absolute():
-                base = self.cwd.path()
-                raw = base.joinpath(raw)
-        parts: list[str] = []
-        for part in raw.parts:
-            if part in ("", "/", "."):
-                continue
-            if part == "..":
-                if parts:
-                    parts.pop()
-                continue
-            parts.append(part)
-        return PurePosixPath("/" + "/".join(parts)) if parts else PurePosixPath("/")
+            return self.cwd.path()
+        if isinstance(path, PurePosixPath):
+            # PurePosixPath already folds "." and repeated slashes; only ".." and
+            # the POSIX "//" anchor still need the full normalizer.
+            if path.parts[:1] == ("/",) and ".." not in path.parts:
+                return path
+            path = str(path)
+        if not path.startswith("/"):
+            path = f"{self.cwd.path_str()}/{path}"
+        return _normalize_absolute(path)
 
     def _iterate_parts(self, path: PurePosixPath) -> Iterable[str]:
         for part in path.parts:
@@ -96,44 +198,94 @@ class VirtualFileSystem:
                 continue
             yield part
 
+    def _absolute_parts(self, path: str | PurePosixPath) -> list[str] | None:
+        # Canonical absolute strings ("/a/b") can be split directly; anything with
+        # empty, "." or ".." segments or a trailing slash takes the full normalizer.
+        if not isinstance(path, str) or not path.startswith("/"):
+            return None
+        if path == _ROOT_STR:
+            return []
+        if "//" in path or "/." in path or path.endswith("/"):
+            return None
+        return path[1:].split("/")
+
+    def _cwd_attached(self) -> bool:
+        # A removed cwd keeps its parent pointers, so check each link is still live.
+        node: VirtualNode = self.cwd
+        while node.parent is not None:
+            if node.parent.children.get(node.name) is not node:
+                return False
+            node = node.parent
+        return node is self.root
+
     def _resolve_node(self, path: str | PurePosixPath) -> VirtualNode:
-        target = self._normalize(path)
+        # Only absolute strings are cached: relative lookups depend on cwd.
+        cache_key = path if isinstance(path, str) and path.startswith("/") else None
+        if cache_key is not None:
+            cached = self._resolve_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        parts = self._absolute_parts(path)
+        if parts is None:
+            parts = list(self._iterate_parts(self._normalize(path)))
         current: VirtualNode = self.root
-        if target == PurePosixPath("/"):
-            return self.root
-        for part in self._iterate_parts(target):
+        for part in parts:
             if not isinstance(current, VirtualDirectory):
-                raise InvalidOperation(f"{current.path()} is not a directory")
+                raise InvalidOperation(f"{current.path_str()} is not a directory")
             current = current.get_child(part, self)
+        if cache_key is not None:
+            if len(self._resolve_cache) >= _RESOLVE_CACHE_SIZE:
+                self._resolve_cache.clear()
+            self._resolve_cache[cache_key] = current
         return current
 
+    def _invalidate_resolve_cache(self) -> None:
+        # The cache only holds positive lookups, so creating nodes never makes it
+        # stale; anything that detaches or replaces nodes must call this.
+        self._resolve_cache.clear()
+        self._tree_epoch += 1
+
     def _resolve_dir(self, path: str | PurePosixPath, *, create: bool = False) -> VirtualDirectory:
+        if not create:
+            node = self._resolve_node(path)
+            if not isinstance(node, VirtualDirectory):
+                raise InvalidOperation(f"{node.path_str()} is not a directory")
+            return node
         target = self._normalize(path)
-        if target == PurePosixPath("/"):
+        if target == _ROOT:
             return self.root
         current = self.root
         for part in self._iterate_parts(target):
             if not isinstance(current, VirtualDirectory):
-                raise InvalidOperation(f"{current.path()} is not a directory")
+                raise InvalidOperation(f"{current.path_str()} is not a directory")
             try:
                 next_node = current.get_child(part, self)
             except NodeNotFound:
                 if not create:
                     raise
-                next_node = VirtualDirectory(name=part, parent=current)
+                next_node = VirtualDirectory(name=part, parent=current, created_at=self._now())
                 current.add_child(next_node)
+                self._tree_epoch += 1
             if not isinstance(next_node, VirtualDirectory):
-                raise InvalidOperation(f"{next_node.path()} is not a directory")
+                raise InvalidOperation(f"{next_node.path_str()} is not a directory")
             current = next_node
         return current
 
     def _ensure_file(self, path: str | PurePosixPath, *, create: bool = False) -> VirtualFile:
-        target = self._normalize(path)
-        parent_path = target.parent
-        if parent_path == target:
-            raise InvalidOperation("Cannot create file at root path")
-        parent = self._resolve_dir(parent_path or PurePosixPath("/"), create=create)
-        name = target.name
+        parent: VirtualDirectory
+        if _is_plain_name(path) and self._cwd_attached():
+            # A bare name lives directly in the cwd; skip normalizing and resolving.
+            parent, name = self.cwd, str(path)
+        else:
+            target = str(self._normalize(path))
+            if target == _ROOT_STR:
+                raise InvalidOperation("Cannot create file at root path")
+            # String splitting keeps the parent lookup on the resolve cache's fast path.
+            parent_str, _, name = target.rpartition("/")
+            parent = self._resolve_dir(parent_str or _ROOT_STR, create=create)
+        return self._child_file(parent, name, create=create)
+
+    def _child_file(self, parent: VirtualDirectory, name: str, *, create: bool) -> VirtualFile:
         if not name:
             raise InvalidOperation("Missing file name")
         try:
@@ -141,22 +293,24 @@ class VirtualFileSystem:
         except NodeNotFound:
             if not create:
                 raise
-            node = VirtualFile(name=name, parent=parent)
+            node = VirtualFile(name=name, parent=parent, created_at=self._now())
             parent.add_child(node)
+            self._tree_epoch += 1
             return node
         if not isinstance(node, VirtualFile):
-            raise InvalidOperation(f"{node.path()} is not a file")
+            raise InvalidOperation(f"{node.path_str()} is not a file")
         return node
 
     def _ensure_read_allowed(self, node: VirtualNode) -> None:
-        if not node.policy.readable:
-            raise InvalidOperation(f"{node.path()} is not readable")
+        if not node.policy._bits & _POLICY_READ:
+            raise InvalidOperation(f"{node.path_str()} is not readable")
 
     def _ensure_write_allowed(self, node: VirtualNode, *, append: bool = False) -> None:
-        if not node.policy.writable:
-            raise InvalidOperation(f"{node.path()} is read-only")
-        if node.policy.append_only and not append:
-            raise InvalidOperation(f"{node.path()} is append-only")
+        bits = node.policy._bits
+        if not bits & _POLICY_WRITE:
+            raise InvalidOperation(f"{node.path_str()} is read-only")
+        if bits & _POLICY_APPEND_ONLY and not append:
+            raise InvalidOperation(f"{node.path_str()} is append-only")
 
     def _check_version(self, node: VirtualNode, expected_version: int | None) -> None:
         if expected_version is None:
@@ -164,88 +318,160 @@ class VirtualFileSystem:
         if node.version != expected_version:
             raise InvalidOperation(
                 (
-                    f"Version mismatch for {node.path()}: "
+                    f"Version mismatch for {node.path_str()}: "
                     f"expected {expected_version}, current {node.version}"
                 )
             )
 
-    def _emit_write_event(self, node: VirtualFile, *, append: bool, event_type: str) -> None:
+    def _dispatch_write_event(
+        self,
+        path: PurePosixPath,
+        content: str,
+        version: int,
+        *,
+        append: bool,
+        event_type: str,
+    ) -> None:
         if self._write_hooks:
-            path = node.path()
-            content = node.read(self)
-            event = WriteEvent(path=str(path), content=content, version=node.version, append=append)
-            for prefix, hook in self._write_hooks:
-                if self._path_matches_prefix(path, prefix):
-                    hook(event)
+            event = WriteEvent(path=str(path), content=content, version=version, append=append)
+            for hook in self._write_hooks.matches(path):
+                hook(event)
 
-        self._emit_path_event(node.path(), event_type, node.read(self))
+        self._emit_path_event(path, event_type, content)
 
     def _emit_path_event(self, path: PurePosixPath, event_type: str, content: str | None) -> None:
         if not self._path_hooks:
             return
         payload = PathEvent(path=str(path), event=event_type, content=content)
-        for prefix, hook in self._path_hooks:
-            if self._path_matches_prefix(path, prefix):
-                hook(payload)
-
-    def _path_matches_prefix(self, path: PurePosixPath, prefix: PurePosixPath) -> bool:
-        if prefix == PurePosixPath("/"):
-            return True
-        try:
-            path.relative_to(prefix)
-            return True
-        except ValueError:
-            return False
-
-    def _clone_policy(self, policy: NodePolicy) -> NodePolicy:
-        return NodePolicy(
-            readable=policy.readable,
-            writable=policy.writable,
-            append_only=policy.append_only,
-            classification=policy.classification,
-            principals=set(policy.principals),
-        )
+        for hook in self._path_hooks.matches(path):
+            hook(payload)
 
     def _find_storage_mount(
         self, path: PurePosixPath
     ) -> tuple[PurePosixPath, StorageAdapter] | None:
-        matches: list[tuple[PurePosixPath, StorageAdapter]] = []
+        return self._mount_trie.longest(path)
+
+    def _set_storage_mounts(self, mounts: Mapping[str, StorageAdapter]) -> None:
+        self._storage_mounts = {PurePosixPath(path): adapter for path, adapter in mounts.items()}
+        self._mount_trie = PathTrie()
         for prefix, adapter in self._storage_mounts.items():
-            if self._path_matches_prefix(path, prefix):
-                matches.append((prefix, adapter))
-        if not matches:
-            return None
-        return max(matches, key=lambda item: len(item[0].parts))
+            self._mount_trie.set(prefix, adapter)
 
     def _relative_storage_path(self, path: PurePosixPath, prefix: PurePosixPath) -> str:
         rel = path.relative_to(prefix)
         return rel.as_posix()
 
-    def _persist_storage(self, node: VirtualFile, previous_version: int) -> None:
-        mount = self._find_storage_mount(node.path())
+    def _persist_storage(
+        self, node: VirtualFile, previous_version: int, path: PurePosixPath, content: str
+    ) -> None:
+        mount = self._find_storage_mount(path)
         if not mount:
             return
         prefix, adapter = mount
-        relative = self._relative_storage_path(node.path(), prefix)
+        relative = self._relative_storage_path(path, prefix)
         try:
-            adapter.write(relative, node.read(self), version=previous_version)
+            adapter.write(relative, content, version=previous_version)
         except ValueError as exc:
             node.version = previous_version
-            raise InvalidOperation(f"Storage conflict for {node.path()}") from exc
+            raise InvalidOperation(f"Storage conflict for {path}") from exc
 
-    def _delete_storage_entry(self, node: VirtualFile) -> None:
-        mount = self._find_storage_mount(node.path())
+    def _delete_storage_entry(self, path: PurePosixPath) -> None:
+        mount = self._find_storage_mount(path)
         if not mount:
             return
         prefix, adapter = mount
-        relative = self._relative_storage_path(node.path(), prefix)
+        relative = self._relative_storage_path(path, prefix)
         adapter.delete(relative)
 
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer storage persistence and hooks for writes and deletes in the block.
+
+        The in-memory tree and search index update immediately, and every write
+        in the block shares one timestamp. When the outermost ``batch()`` exits,
+        pending adapter calls are issued grouped by storage mount, then hooks
+        fire in their original order. If an adapter reports a conflict, the
+        remaining operations are still flushed and the first conflict is raised
+        afterwards.
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = []
+        self._batch_now = self._clock()
+        try:
+            yield
+        finally:
+            pending, self._batch = self._batch, None
+            self._batch_now = None
+            self._flush_batch(pending)
+
+    def _now(self) -> float:
+        return self._batch_now if self._batch_now is not None else self._clock()
+
+    def _flush_batch(self, pending: list[_PendingOp]) -> None:
+        mounted: dict[PurePosixPath, tuple[StorageAdapter, list[int]]] = {}
+        for index, op in enumerate(pending):
+            mount = self._find_storage_mount(op.path)
+            if mount is not None:
+                prefix, adapter = mount
+                mounted.setdefault(prefix, (adapter, []))[1].append(index)
+
+        failed: set[int] = set()
+        conflict: tuple[PurePosixPath, ValueError] | None = None
+        for prefix, (adapter, indexes) in mounted.items():
+            for index in indexes:
+                op = pending[index]
+                relative = self._relative_storage_path(op.path, prefix)
+                if op.content is None:
+                    adapter.delete(relative)
+                    continue
+                try:
+                    adapter.write(relative, op.content, version=op.previous_version)
+                except ValueError as exc:
+                    failed.add(index)
+                    if op.node.version == op.version:
+                        op.node.version = op.previous_version
+                    if conflict is None:
+                        conflict = (op.path, exc)
+
+        for index, op in enumerate(pending):
+            if index in failed:
+                continue
+            if op.content is None:
+                self._emit_path_event(op.path, op.event_type, None)
+            else:
+                self._dispatch_write_event(
+                    op.path, op.content, op.version, append=op.append, event_type=op.event_type
+                )
+        if conflict is not None:
+            path, cause = conflict
+            raise InvalidOperation(f"Storage conflict for {path}") from cause
+
     def _load_storage_mount(self, prefix: PurePosixPath, adapter: StorageAdapter) -> None:
+        self._apply_storage_entries(prefix, adapter.list())
+
+    def _apply_storage_entries(
+        self, prefix: PurePosixPath, entries: Mapping[str, StorageEntry]
+    ) -> None:
         directory = self._resolve_dir(prefix)
+        # Nested mounts own their subtrees: lift their directories out before the
+        # clear and graft them back (shallowest first) so they survive the refresh.
+        nested: list[tuple[PurePosixPath, VirtualNode]] = []
+        for mount in sorted(self._storage_mounts, key=lambda mount: len(mount.parts)):
+            if mount != prefix and mount.is_relative_to(prefix):
+                try:
+                    nested.append((mount, self._resolve_node(str(mount))))
+                except NodeNotFound:
+                    continue
         directory.children.clear()
+        self._invalidate_resolve_cache()
         directory._loaded = True
-        for rel_path, entry in adapter.list().items():
+        for mount, mount_node in nested:
+            parent = self._resolve_dir(mount.parent, create=True)
+            if mount_node.name not in parent.children:
+                parent.add_child(mount_node)
+        for rel_path, entry in entries.items():
             absolute = prefix.joinpath(PurePosixPath(rel_path))
             file_node = self._ensure_file(absolute, create=True)
             file_node.write(entry.content)
@@ -264,6 +490,10 @@ class VirtualFileSystem:
             entries.append((path, content))
         self._full_text_index.build(entries)
 
+    def _index_content(self, path: PurePosixPath, content: str) -> None:
+        if self._full_text_index is not None:
+            self._full_text_index.index_file(path, content)
+
     def _index_file(self, node: VirtualFile) -> None:
         if self._full_text_index is None:
             return
@@ -308,6 +538,7 @@ class VirtualFileSystem:
     def _reset_directory(self, path: str | PurePosixPath) -> None:
         directory = self._resolve_dir(path)
         directory.children.clear()
+        self._invalidate_resolve_cache()
         directory._loaded = False
 
     def _search_view_provider(self) -> Mapping[str, ProvidedNode]:
@@ -347,12 +578,12 @@ class VirtualFileSystem:
     # Public API
     # ------------------------------------------------------------------
     def pwd(self) -> str:
-        return str(self.cwd.path())
+        return self.cwd.path_str()
 
     def cd(self, path: str | PurePosixPath) -> str:
         node = self._resolve_node(path)
         if not isinstance(node, VirtualDirectory):
-            raise InvalidOperation(f"{node.path()} is not a directory")
+            raise InvalidOperation(f"{node.path_str()} is not a directory")
         self._ensure_read_allowed(node)
         self.cwd = node
         return self.pwd()
@@ -363,24 +594,55 @@ class VirtualFileSystem:
         *,
         view: VisibilityView | None = None,
     ) -> list[DirEntry]:
-        directory = self._resolve_dir(path or self.cwd.path())
+        directory = self._resolve_dir(path or self.cwd.path_str())
         self._ensure_read_allowed(directory)
         directory.ensure_loaded(self)
-        entries: list[DirEntry] = []
-        for child in directory.iter_children(self):
-            if view and not view.allows_node(child):
-                continue
-            entries.append(
-                DirEntry(
-                    name=child.name,
-                    path=child.path(),
-                    is_dir=isinstance(child, VirtualDirectory),
-                    metadata=child.metadata,
-                    policy=child.policy,
-                )
+        base = directory.path()
+        # One pass filters and decorates (isinstance evaluated once per child);
+        # DirEntry objects are only built for the sorted survivors.
+        ordered = sorted(
+            (not isinstance(child, VirtualDirectory), child.name, child)
+            for child in self._visible_children(directory, view)
+        )
+        return [
+            DirEntry(
+                name=name,
+                path=base / name,
+                is_dir=not is_file,
+                metadata=child._metadata if child._metadata is not None else _NO_METADATA,
+                policy=child.policy,
             )
-        entries.sort(key=lambda entry: (not entry.is_dir, entry.name))
-        return entries
+            for is_file, name, child in ordered
+        ]
+
+    def iter_visible_children(
+        self,
+        path: str | PurePosixPath | None = None,
+        view: VisibilityView | None = None,
+    ) -> Iterator[tuple[str, VirtualNode]]:
+        """Yield ``(name, node)`` for each child of ``path`` that ``view`` allows."""
+        directory = self._resolve_dir(path or self.cwd.path_str())
+        self._ensure_read_allowed(directory)
+        directory.ensure_loaded(self)
+        for child in self._visible_children(directory, view):
+            yield child.name, child
+
+    def _visible_children(
+        self, directory: VirtualDirectory, view: VisibilityView | None
+    ) -> Iterator[VirtualNode]:
+        if view is None:
+            yield from directory.iter_children(self)
+            return
+        # The prefix check is settled once for the directory: when a prefix
+        # already contains it, every child passes without rebuilding its path.
+        base = directory.path_str()
+        check_prefix = not view._covers_path(PurePosixPath(base))
+        check_metadata = view.metadata_filters is not None
+        for child in view._allowed_nodes(directory.iter_children(self)):
+            if check_prefix and not view.allows_path(PurePosixPath(_join_path(base, child.name))):
+                continue
+            if not check_metadata or view._matches_metadata(child):
+                yield child
 
     def search(
         self,
@@ -422,7 +684,7 @@ class VirtualFileSystem:
         except (NodeNotFound, InvalidOperation):
             return file_results
         flags = re.MULTILINE | (re.IGNORECASE if query.ignore_case else 0)
-        compiled = re.compile(query.query, flags) if query.regex else None
+        compiled = _compile_pattern(query.query, flags) if query.regex else None
         lowered = query.query.lower() if query.ignore_case and not query.regex else None
         for path, node in files:
             if self._search_view_prefix and path.is_relative_to(self._search_view_prefix):
@@ -470,14 +732,53 @@ class VirtualFileSystem:
         else:
             pattern_path = cwd_path.joinpath(PurePosixPath(pattern))
 
+        pattern_str = str(pattern_path)
         matches: list[str] = []
-        for path, node in self.walk("/"):
+        for path_str, node in self._walk_nodes(self.root):
             if view and not view.allows_node(node):
                 continue
-            if fnmatch.fnmatchcase(str(path), str(pattern_path)):
-                matches.append(str(path))
+            if fnmatch.fnmatchcase(path_str, pattern_str):
+                matches.append(path_str)
         return sorted(matches)
 
+    def find(
+        self,
+        path: str | PurePosixPath | None = None,
+        *,
+        name_pattern: str | None = None,
+        node_type: str | None = None,
+        view: VisibilityView | None = None,
+    ) -> list[str]:
+        """Return paths under ``path`` in pre-order, like ``find(1)``.
+
+        ``name_pattern`` is a shell glob matched against each node name and
+        ``node_type`` is ``"f"`` or ``"d"``. Nodes hidden by ``view`` are
+        pruned together with their subtrees.
+        """
+        if node_type not in (None, "f", "d"):
+            raise InvalidOperation(f"Unknown node type filter: {node_type}")
+        # Compile the glob once for the whole traversal rather than per node.
+        match = re.compile(fnmatch.translate(name_pattern)).match if name_pattern else None
+        want_dirs = None if node_type is None else node_type == "d"
+        start_node = self._resolve_node(path or self.cwd.path_str())
+        results: list[str] = []
+        stack: list[tuple[str, VirtualNode]] = [(start_node.path_str(), start_node)]
+        while stack:
+            path_str, node = stack.pop()
+            if view and not view.allows_node(node):
+                continue
+            is_dir = isinstance(node, VirtualDirectory)
+            if (want_dirs is None or is_dir == want_dirs) and (
+                match is None or match(node.name)
+            ):
+                results.append(path_str)
+            if isinstance(node, VirtualDirectory):
+                stack.extend(
+                    (_join_path(path_str, child.name), child)
+                    for child in reversed(list(node.iter_children(self)))
+                )
+        return results
+
     def mkdir(
         self,
         path: str | PurePosixPath,
@@ -485,24 +786,29 @@ class VirtualFileSystem:
         parents: bool = False,
         exist_ok: bool = False,
     ) -> VirtualDirectory:
-        normalized = self._normalize(path)
-        if normalized == PurePosixPath("/"):
-            return self.root
-        parent = self._resolve_dir(normalized.parent or PurePosixPath("/"), create=parents)
+        if _is_plain_name(path) and self._cwd_attached():
+            # A bare name lives directly in the cwd; skip normalizing and resolving.
+            parent, name = self.cwd, str(path)
+        else:
+            normalized = self._normalize(path)
+            if normalized == _ROOT:
+                return self.root
+            parent = self._resolve_dir(normalized.parent, create=parents)
+            name = normalized.name
         self._ensure_write_allowed(parent)
-        name = normalized.name
         if not name:
             raise InvalidOperation("Directory name missing")
         try:
             existing = parent.get_child(name, self)
         except NodeNotFound:
-            node = VirtualDirectory(name=name, parent=parent)
+            node = VirtualDirectory(name=name, parent=parent, created_at=self._now())
             parent.add_child(node)
+            self._tree_epoch += 1
             return node
         if not isinstance(existing, VirtualDirectory):
-            raise InvalidOperation(f"{existing.path()} is not a directory")
+            raise InvalidOperation(f"{existing.path_str()} is not a directory")
         if not exist_ok:
-            raise NodeExists(f"Directory {existing.path()} already exists")
+            raise NodeExists(f"Directory {existing.path_str()} already exists")
         return existing
 
     def write_file(
@@ -513,17 +819,77 @@ class VirtualFileSystem:
         append: bool = False,
         expected_version: int | None = None,
     ) -> VirtualFile:
-        node = self._ensure_file(path, create=True)
+        pinned = self._batch_now is None
+        if pinned:
+            # One clock reading stamps both a new file's creation and this write.
+            self._batch_now = self._clock()
+        try:
+            node = self._ensure_file(path, create=True)
+            return self._write_node(node, data, append=append, expected_version=expected_version)
+        finally:
+            if pinned:
+                self._batch_now = None
+
+    def populate(self, files: Mapping[str, str]) -> list[VirtualFile]:
+        """Write many files at once, resolving each distinct parent directory once.
+
+        Files are created in mapping order, so the tree matches what sequential
+        :meth:`write_file` calls would build. The writes run inside :meth:`batch`.
+        """
+        parents: dict[str, VirtualDirectory] = {}
+        written: list[VirtualFile] = []
+        with self.batch():
+            for path, data in files.items():
+                target = str(self._normalize(path))
+                if target == _ROOT_STR:
+                    raise InvalidOperation("Cannot create file at root path")
+                parent_str, _, name = target.rpartition("/")
+                parent = parents.get(parent_str)
+                if parent is None:
+                    parent = parents[parent_str] = self._resolve_dir(
+                        parent_str or _ROOT_STR, create=True
+                    )
+                node = self._child_file(parent, name, create=True)
+                written.append(self._write_node(node, data))
+        return written
+
+    def _write_node(
+        self,
+        node: VirtualFile,
+        data: str,
+        *,
+        append: bool = False,
+        expected_version: int | None = None,
+    ) -> VirtualFile:
         self._ensure_write_allowed(node, append=append)
         self._check_version(node, expected_version)
         previous_version = node.version
         node.write(data, append=append)
         node.version += 1
-        node.modified_at = time.time()
-        self._persist_storage(node, previous_version)
-        self._index_file(node)
+        node.modified_at = self._now()
         event_type = "create" if previous_version == 0 else "update"
-        self._emit_write_event(node, append=append, event_type=event_type)
+        # Resolve the path and content once for persistence, indexing and hooks.
+        node_path = node.path()
+        content = node.read(self)
+        if self._batch is not None:
+            self._batch.append(
+                _PendingOp(
+                    node=node,
+                    path=node_path,
+                    event_type=event_type,
+                    content=content,
+                    previous_version=previous_version,
+                    version=node.version,
+                    append=append,
+                )
+            )
+            self._index_content(node_path, content)
+            return node
+        self._persist_storage(node, previous_version, node_path, content)
+        self._index_content(node_path, content)
+        self._dispatch_write_event(
+            node_path, content, node.version, append=append, event_type=event_type
+        )
         return node
 
     def append_file(
@@ -540,15 +906,28 @@ class VirtualFileSystem:
         self._ensure_read_allowed(node)
         return node.read(self)
 
+    def read_tail_lines(self, path: str | PurePosixPath, count: int) -> str:
+        """Return the last ``count`` lines of a file without re-splitting it each call."""
+        node = self._ensure_file(path, create=False)
+        self._ensure_read_allowed(node)
+        return node.read_tail_lines(count, self)
+
     def touch(self, path: str | PurePosixPath) -> VirtualFile:
-        node = self._ensure_file(path, create=True)
-        self._ensure_write_allowed(node, append=True)
-        node.modified_at = time.time()
-        return node
+        pinned = self._batch_now is None
+        if pinned:
+            self._batch_now = self._clock()
+        try:
+            node = self._ensure_file(path, create=True)
+            self._ensure_write_allowed(node, append=True)
+            node.modified_at = self._now()
+            return node
+        finally:
+            if pinned:
+                self._batch_now = None
 
     def remove(self, path: str | PurePosixPath, *, recursive: bool = False) -> None:
         target = self._normalize(path)
-        if target == PurePosixPath("/"):
+        if target == _ROOT:
             raise InvalidOperation("Cannot remove root directory")
         node = self._resolve_node(target)
         if isinstance(node, VirtualDirectory):
@@ -561,21 +940,38 @@ class VirtualFileSystem:
         if isinstance(node, VirtualDirectory) and node.children and not recursive:
             raise InvalidOperation("Directory not empty; pass recursive=True")
         if isinstance(node, VirtualDirectory) and recursive:
-            names = list(node.children.keys())
-            for child_name in names:
-                child_node = node.children.get(child_name)
-                if child_node is None:
-                    continue
-                self.remove(child_node.path(), recursive=True)
+            self._remove_tree(parent, node)
+            return
         parent.remove_child(node.name)
+        self._invalidate_resolve_cache()
         if isinstance(node, VirtualFile):
-            self._delete_storage_entry(node)
-            self._remove_index_entry(node.path())
-            self._emit_path_event(node.path(), "delete", None)
+            self._forget_removed_file(node, target)
+
+    def _remove_tree(self, parent: VirtualDirectory, directory: VirtualDirectory) -> None:
+        # Validate the whole subtree in one pre-walk before detaching anything, so
+        # a read-only descendant cannot leave a half-removed tree behind. The
+        # subtree is then detached once; descendants need no per-node unlinking.
+        subtree = list(self._walk_nodes(directory))
+        for _, descendant in subtree:
+            self._ensure_write_allowed(descendant)
+        parent.remove_child(directory.name)
+        self._invalidate_resolve_cache()
+        for path_str, descendant in subtree:
+            if isinstance(descendant, VirtualFile):
+                self._forget_removed_file(descendant, PurePosixPath(path_str))
+
+    def _forget_removed_file(self, node: VirtualFile, path: PurePosixPath) -> None:
+        if self._batch is not None:
+            self._batch.append(_PendingOp(node=node, path=path, event_type="delete"))
+            self._remove_index_entry(path)
+            return
+        self._delete_storage_entry(path)
+        self._remove_index_entry(path)
+        self._emit_path_event(path, "delete", None)
 
     def move(self, source: str | PurePosixPath, target: str | PurePosixPath) -> None:
         src_path = self._normalize(source)
-        if src_path == PurePosixPath("/"):
+        if src_path == _ROOT:
             raise InvalidOperation("Cannot move root directory")
         node = self._resolve_node(src_path)
         original_path = node.path()
@@ -592,7 +988,7 @@ class VirtualFileSystem:
         try:
             dest_node = self._resolve_node(dest_path)
         except (NodeNotFound, InvalidOperation):
-            dest_parent = self._resolve_dir(dest_path.parent or PurePosixPath("/"))
+            dest_parent = self._resolve_dir(dest_path.parent)
             self._ensure_write_allowed(dest_parent)
             dest_name = dest_path.name
             if not dest_name:
@@ -623,6 +1019,7 @@ class VirtualFileSystem:
             raise InvalidOperation("Cannot move a node into itself")
 
         parent.remove_child(node.name)
+        self._invalidate_resolve_cache()
         node.name = dest_name
         dest_parent.add_child(node)
         if isinstance(node, VirtualFile):
@@ -651,7 +1048,7 @@ class VirtualFileSystem:
         try:
             dest_node = self._resolve_node(dest_path)
         except (NodeNotFound, InvalidOperation):
-            dest_parent = self._resolve_dir(dest_path.parent or PurePosixPath("/"))
+            dest_parent = self._resolve_dir(dest_path.parent)
             self._ensure_write_allowed(dest_parent)
             dest_name = dest_path.name
             if not dest_name:
@@ -668,6 +1065,8 @@ class VirtualFileSystem:
                 self._ensure_write_allowed(parent_node)
                 self._ensure_write_allowed(dest_node)
                 parent_node.remove_child(dest_node.name)
+                self._invalidate_resolve_cache()
+                self._remove_index_entry(dest_node.path())
                 dest_name = dest_node.name
                 dest_parent = parent_node
 
@@ -683,42 +1082,84 @@ class VirtualFileSystem:
         clone = self._clone_node(node, recursive=recursive)
         clone.name = dest_name
         dest_parent.add_child(clone)
+        self._tree_epoch += 1
         if isinstance(clone, VirtualFile):
             self._index_file(clone)
         else:
-            self._rebuild_index()
+            self._index_subtree(clone)
+
+    def _index_subtree(self, root: VirtualNode) -> None:
+        # Index only the freshly attached subtree instead of rebuilding the whole index.
+        if self._full_text_index is None:
+            return
+        skip = self._search_view_prefix
+        for path_str, node in self._walk_nodes(root):
+            if not isinstance(node, VirtualFile):
+                continue
+            path = PurePosixPath(path_str)
+            if skip is not None and path.is_relative_to(skip):
+                continue
+            try:
+                self._full_text_index.index_file(path, node.read(self))
+            except InvalidOperation:
+                continue
 
     def _clone_node(self, node: VirtualNode, *, recursive: bool) -> VirtualNode:
+        # Iterative so deep trees do not recurse; file text is shared by reference
+        # since strings are immutable, so no content is duplicated.
+        # Every node in the copy shares one clock reading.
+        now = self._now()
+        clone = self._clone_single(node, now)
+        if isinstance(node, VirtualDirectory) and isinstance(clone, VirtualDirectory):
+            stack: list[tuple[VirtualDirectory, VirtualDirectory]] = [(node, clone)]
+            while stack:
+                source_dir, target_dir = stack.pop()
+                for child in source_dir.iter_children(self):
+                    child_clone = self._clone_single(child, now)
+                    target_dir.add_child(child_clone)
+                    if isinstance(child, VirtualDirectory) and isinstance(
+                        child_clone, VirtualDirectory
+                    ):
+                        stack.append((child, child_clone))
+        return clone
+
+    def _clone_single(self, node: VirtualNode, now: float) -> VirtualNode:
+        clone: VirtualNode
         if isinstance(node, VirtualFile):
-            file_clone = VirtualFile(name=node.name, metadata=dict(node.metadata))
-            file_clone.policy = self._clone_policy(node.policy)
-            file_clone.write(node.read(self))
-            # Timestamps are left as-is since the new node is initialized with current time.
-            return file_clone
-        if isinstance(node, VirtualDirectory):
-            node.ensure_loaded(self)
-            directory_clone = VirtualDirectory(name=node.name, metadata=dict(node.metadata))
-            directory_clone.policy = self._clone_policy(node.policy)
-            for child in node.iter_children(self):
-                child_clone = self._clone_node(child, recursive=recursive)
-                directory_clone.add_child(child_clone)
-            return directory_clone
-        raise InvalidOperation("Unsupported node type for copy")
+            clone = VirtualFile(
+                name=node.name, content=node.read(self), metadata=node._metadata, created_at=now
+            )
+        elif isinstance(node, VirtualDirectory):
+            clone = VirtualDirectory(name=node.name, metadata=node._metadata, created_at=now)
+        else:
+            raise InvalidOperation("Unsupported node type for copy")
+        # Policies are frozen, so the clone can share the source's.
+        clone.policy = node.policy
+        return clone
 
     def walk(
         self,
         path: str | PurePosixPath | None = None,
     ) -> Iterator[tuple[PurePosixPath, VirtualNode]]:
-        start_node = self._resolve_node(path or self.cwd.path())
-
-        def _walk(node: VirtualNode) -> Iterator[tuple[PurePosixPath, VirtualNode]]:
-            yield (node.path(), node)
+        start_node = self._resolve_node(path or self.cwd.path_str())
+        for path_str, node in self._walk_nodes(start_node):
+            yield (PurePosixPath(path_str), node)
+
+    def _walk_nodes(self, start_node: VirtualNode) -> Iterator[tuple[str, VirtualNode]]:
+        # Explicit stack instead of recursion: no per-directory generator frames and
+        # no recursion limit on deep trees. Children are pushed in reverse so they
+        # pop in their natural order, keeping the pre-order of the recursive walk.
+        # Each entry carries its path string, so a child's path is one join on its
+        # parent's rather than an O(depth) walk up the parent pointers.
+        stack: list[tuple[str, VirtualNode]] = [(start_node.path_str(), start_node)]
+        while stack:
+            path_str, node = stack.pop()
+            yield (path_str, node)
             if isinstance(node, VirtualDirectory):
-                node.ensure_loaded(self)
-                for child in node.iter_children(self):
-                    yield from _walk(child)
-
-        return _walk(start_node)
+                stack.extend(
+                    (_join_path(path_str, child.name), child)
+                    for child in reversed(list(node.iter_children(self)))
+                )
 
     def iter_files(
         self,
@@ -727,7 +1168,7 @@ class VirtualFileSystem:
         recursive: bool = True,
         skip_prefixes: Iterable[PurePosixPath] | None = None,
     ) -> Iterator[tuple[PurePosixPath, VirtualFile]]:
-        start_node = self._resolve_node(path or self.cwd.path())
+        start_node = self._resolve_node(path or self.cwd.path_str())
         self._ensure_read_allowed(start_node)
         prefixes = list(skip_prefixes or [])
 
@@ -740,86 +1181,169 @@ class VirtualFileSystem:
             return
 
         directory = self._resolve_dir(start_node.path())
-        if should_skip(directory.path()):
+        directory_path = directory.path()
+        if should_skip(directory_path):
             return
-        directory.ensure_loaded(self)
 
-        def _walk_dir(dir_node: VirtualDirectory) -> Iterator[tuple[PurePosixPath, VirtualFile]]:
-            if should_skip(dir_node.path()):
-                return
-            for child in dir_node.iter_children(self):
-                if isinstance(child, VirtualFile):
-                    if not should_skip(child.path()):
-                        yield (child.path(), child)
-                elif isinstance(child, VirtualDirectory) and recursive:
-                    if should_skip(child.path()):
-                        continue
-                    child.ensure_loaded(self)
-                    yield from _walk_dir(child)
-
-        yield from _walk_dir(directory)
+        def push(parent: VirtualDirectory, parent_path: PurePosixPath) -> None:
+            stack.extend(
+                (parent_path / child.name, child)
+                for child in reversed(list(parent.iter_children(self)))
+            )
+
+        stack: list[tuple[PurePosixPath, VirtualNode]] = []
+        push(directory, directory_path)
+        while stack:
+            child_path, child = stack.pop()
+            if isinstance(child, VirtualFile):
+                if not should_skip(child_path):
+                    yield (child_path, child)
+            elif isinstance(child, VirtualDirectory) and recursive:
+                if should_skip(child_path):
+                    continue
+                push(child, child_path)
 
     def snapshot(self) -> VFSSnapshot:
-        nodes: dict[str, NodeSnapshot] = {}
-        for path, node in self.walk("/"):
-            if isinstance(node, VirtualFile):
-                content = node.read(self)
-            else:
-                content = None
-            nodes[str(path)] = NodeSnapshot(
-                is_dir=isinstance(node, VirtualDirectory),
-                metadata=dict(node.metadata),
-                policy=self._clone_policy(node.policy),
-                version=node.version,
-                created_at=node.created_at,
-                modified_at=node.modified_at,
-                content=content,
-            )
+        nodes = {
+            path_str: self._snapshot_node(node) for path_str, node in self._walk_nodes(self.root)
+        }
         storage_mounts = {str(path): adapter for path, adapter in self._storage_mounts.items()}
         return VFSSnapshot(nodes=nodes, cwd=self.cwd.path(), storage_mounts=storage_mounts)
 
+    def _snapshot_node(self, node: VirtualNode) -> NodeSnapshot:
+        return NodeSnapshot(
+            is_dir=isinstance(node, VirtualDirectory),
+            metadata=dict(node._metadata or ()),
+            policy=node.policy,
+            version=node.version,
+            created_at=node.created_at,
+            modified_at=node.modified_at,
+            content=node.read(self) if isinstance(node, VirtualFile) else None,
+        )
+
     def restore(self, snapshot: VFSSnapshot) -> None:
-        self.root = VirtualDirectory(name="")
-        self.cwd = self.root
-        self._storage_mounts = {
-            PurePosixPath(path): adapter for path, adapter in snapshot.storage_mounts.items()
-        }
-        ordered = sorted(snapshot.nodes.items(), key=lambda item: len(PurePosixPath(item[0]).parts))
+        # The replacement tree is built off to the side and swapped in at the
+        # end, so the live tree is never left partially restored. This is not a
+        # concurrency guarantee: the root, cwd, and caches are updated in turn.
+        root = VirtualDirectory(name="")
+        # Depth from the slash count orders parents before children without
+        # parsing each key.
+        # Parents are attached straight from this map instead of going through
+        # mkdir(), which would re-resolve the chain and enforce the write policy
+        # a restored parent may already carry.
+        ordered = sorted(snapshot.nodes.items(), key=_snapshot_order)
+        directories: dict[str, VirtualDirectory] = {_ROOT_STR: root}
         for path_str, node_state in ordered:
-            path = PurePosixPath(path_str)
-            if path == PurePosixPath("/"):
-                target = self.root
-                target.metadata = dict(node_state.metadata)
-                target.policy = self._clone_policy(node_state.policy)
-                target.version = node_state.version
-                target.created_at = node_state.created_at
-                target.modified_at = node_state.modified_at
+            if path_str == _ROOT_STR:
+                self._apply_node_state(root, node_state)
                 continue
+            parent_str, _, name = path_str.rpartition("/")
+            parent = directories.get(parent_str or _ROOT_STR)
+            if parent is None:
+                parent = _restore_missing_parents(directories, parent_str)
+            node: VirtualNode
             if node_state.is_dir:
-                directory = self.mkdir(path, parents=True, exist_ok=True)
-                directory.metadata = dict(node_state.metadata)
-                directory.policy = self._clone_policy(node_state.policy)
-                directory.version = node_state.version
-                directory.created_at = node_state.created_at
-                directory.modified_at = node_state.modified_at
+                node = directories[path_str] = VirtualDirectory(name=name, parent=parent)
             else:
-                file_node = self._ensure_file(path, create=True)
-                file_node.metadata = dict(node_state.metadata)
-                file_node.policy = self._clone_policy(node_state.policy)
-                file_node.write(node_state.content or "")
-                file_node.version = node_state.version
-                file_node.created_at = node_state.created_at
-                file_node.modified_at = node_state.modified_at
-        self.cwd = self._resolve_dir(snapshot.cwd)
+                node = VirtualFile(name=name, parent=parent)
+            parent.add_child(node)
+            self._apply_node_state(node, node_state)
+
+        self._set_storage_mounts(snapshot.storage_mounts)
+        self.root = root
+        cwd = directories.get(str(snapshot.cwd))
+        if cwd is None:
+            # Path objects bypass the resolve cache, so this walks the new root.
+            cwd = self._resolve_dir(snapshot.cwd)
+        self.cwd = cwd
+        # Cleared only once root and cwd both point at the new tree, so nothing
+        # from the old tree can be re-cached.
+        self._invalidate_resolve_cache()
         self._rebuild_index()
 
+    def restore_delta(self, snapshot: VFSSnapshot) -> None:
+        """Restore ``snapshot`` by mutating only the nodes that differ from it.
+
+        Nodes whose version, timestamps, metadata, and policy match the snapshot
+        are left untouched (including any directory loaders attached to them),
+        so unchanged nodes are never rewritten or re-indexed. The live tree and
+        the snapshot are still walked in full to find the differences.
+        """
+        self._set_storage_mounts(snapshot.storage_mounts)
+        current = dict(self._walk_nodes(self.root))
+        directories = {
+            path_str: node
+            for path_str, node in current.items()
+            if isinstance(node, VirtualDirectory)
+        }
+        ordered = sorted(snapshot.nodes.items(), key=_snapshot_order)
+        for path_str, node_state in ordered:
+            existing = current.pop(path_str, None)
+            if existing is not None:
+                if isinstance(existing, VirtualDirectory) == node_state.is_dir:
+                    if not self._node_state_matches(existing, node_state):
+                        self._apply_node_state(existing, node_state)
+                        if isinstance(existing, VirtualFile):
+                            self._index_file(existing)
+                    continue
+                # The node changed kind: drop it (and anything beneath it) and recreate.
+                self._detach_for_restore(existing, path_str)
+                directories.pop(path_str, None)
+                for stale in [key for key in current if key.startswith(path_str + "/")]:
+                    self._detach_for_restore(current.pop(stale), stale)
+                    directories.pop(stale, None)
+            parent_str, _, name = path_str.rpartition("/")
+            parent = directories.get(parent_str or _ROOT_STR)
+            if parent is None:
+                parent = _restore_missing_parents(directories, parent_str)
+            created: VirtualNode
+            if node_state.is_dir:
+                created = directories[path_str] = VirtualDirectory(name=name, parent=parent)
+            else:
+                created = VirtualFile(name=name, parent=parent)
+            parent.add_child(created)
+            self._apply_node_state(created, node_state)
+            if isinstance(created, VirtualFile):
+                self._index_file(created)
+        # Whatever is left only exists in the live tree; remove deepest-first.
+        for path_str in sorted(current, key=_path_depth, reverse=True):
+            self._detach_for_restore(current[path_str], path_str)
+        self.cwd = self._resolve_dir(snapshot.cwd)
+
+    def _node_state_matches(self, node: VirtualNode, state: NodeSnapshot) -> bool:
+        return (
+            node.version == state.version
+            and node.modified_at == state.modified_at
+            and node.created_at == state.created_at
+            and (node._metadata or {}) == state.metadata
+            and node.policy == state.policy
+        )
+
+    def _apply_node_state(self, node: VirtualNode, state: NodeSnapshot) -> None:
+        node._metadata = dict(state.metadata) if state.metadata else None
+        node.policy = state.policy
+        self._tree_epoch += 1
+        if isinstance(node, VirtualFile):
+            node.write(state.content or "")
+        node.version = state.version
+        node.created_at = state.created_at
+        node.modified_at = state.modified_at
+
+    def _detach_for_restore(self, node: VirtualNode, path_str: str) -> None:
+        parent = node.parent
+        if parent is not None and parent.children.get(node.name) is node:
+            parent.remove_child(node.name)
+            self._invalidate_resolve_cache()
+        if isinstance(node, VirtualFile):
+            self._remove_index_entry(PurePosixPath(path_str))
+
     def export_to_path(
         self,
         target: Path,
         *,
         source: str | PurePosixPath | None = None,
     ) -> Path:
-        node = self._resolve_dir(source or self.cwd.path())
+        node = self._resolve_dir(source or self.cwd.path_str())
         target = Path(target)
         target.mkdir(parents=True, exist_ok=True)
         self._export_directory(node, target)
@@ -830,23 +1354,45 @@ class VirtualFileSystem:
         self,
         path: str | PurePosixPath | None = None,
     ) -> Iterator[Path]:
-        with tempfile.TemporaryDirectory() as tmp:
+        # SANDFS_MATERIALIZE_BASE lets callers keep scratch trees on e.g. tmpfs.
+        base = os.environ.get("SANDFS_MATERIALIZE_BASE") or None
+        with tempfile.TemporaryDirectory(dir=base) as tmp:
             root = Path(tmp)
             self.export_to_path(root, source=path)
             yield root
 
     def _export_directory(self, node: VirtualDirectory, dest: Path) -> None:
-        node.ensure_loaded(self)
-        dest.mkdir(parents=True, exist_ok=True)
-        for child in node.iter_children(self):
-            target = dest / child.name
-            if isinstance(child, VirtualDirectory):
-                self._export_directory(child, target)
-            elif isinstance(child, VirtualFile):
-                target.parent.mkdir(parents=True, exist_ok=True)
-                target.write_text(child.read(self))
-            else:
-                raise InvalidOperation(f"Unsupported node type during export: {type(child)!r}")
+        # Phase 1: collect the tree breadth-first so every parent directory is
+        # created before its children and each mkdir happens exactly once.
+        dirs: list[Path] = [dest]
+        files: list[tuple[Path, VirtualFile]] = []
+        pending: deque[tuple[VirtualDirectory, Path]] = deque([(node, dest)])
+        while pending:
+            directory, directory_dest = pending.popleft()
+            for child in directory.iter_children(self):
+                target = directory_dest / child.name
+                if isinstance(child, VirtualDirectory):
+                    dirs.append(target)
+                    pending.append((child, target))
+                elif isinstance(child, VirtualFile):
+                    files.append((target, child))
+                else:
+                    raise InvalidOperation(f"Unsupported node type during export: {type(child)!r}")
+        for directory_dest in dirs:
+            directory_dest.mkdir(exist_ok=True)
+        # Phase 2: write files, skipping ones whose on-disk bytes already match.
+        # Content is read on this thread (providers need not be thread-safe);
+        # larger exports overlap the host writes on a thread pool.
+        payloads = [(target, file_node.read(self).encode("utf-8")) for target, file_node in files]
+        if len(payloads) < _PARALLEL_EXPORT_MIN_FILES:
+            for target, data in payloads:
+                _write_if_changed(target, data)
+            return
+        workers = min(_MAX_EXPORT_WORKERS, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_write_if_changed, target, data) for target, data in payloads]
+            for future in futures:
+                future.result()
 
     def exists(self, path: str | PurePosixPath) -> bool:
         try:
@@ -858,7 +1404,7 @@ class VirtualFileSystem:
     def get_version(self, path: str | PurePosixPath) -> int:
         node = self._resolve_node(path)
         if not isinstance(node, VirtualFile):
-            raise InvalidOperation(f"{node.path()} is not a file")
+            raise InvalidOperation(f"{node.path_str()} is not a file")
         return node.version
 
     def is_dir(self, path: str | PurePosixPath) -> bool:
@@ -896,6 +1442,7 @@ class VirtualFileSystem:
         node = self.mkdir(path, parents=True, exist_ok=True)
         node.loader = provider
         node._loaded = False  # allow reload
+        self._invalidate_resolve_cache()
         if metadata:
             node.metadata.update(metadata)
         return node
@@ -911,30 +1458,67 @@ class VirtualFileSystem:
         directory = self.mkdir(normalized, parents=True, exist_ok=True)
         if policy is not None:
             directory.policy = policy
+            self._tree_epoch += 1
         self._storage_mounts[normalized] = adapter
+        self._mount_trie.set(normalized, adapter)
         self._load_storage_mount(normalized, adapter)
         self._rebuild_index()
         return directory
 
-    def sync_storage(self, path: str | PurePosixPath) -> None:
-        normalized = self._normalize(path)
-        adapter = self._storage_mounts.get(normalized)
-        if adapter is None:
-            raise InvalidOperation(f"No storage mount at {normalized}")
-        self._load_storage_mount(normalized, adapter)
+    def sync_storage(self, path: str | PurePosixPath | None = None) -> None:
+        """Refresh storage-backed directories from their adapters.
+
+        Without a path every mount is refreshed; adapter listings are fetched
+        concurrently so slow (remote) adapters overlap instead of queueing.
+        """
+        if path is not None:
+            normalized = self._normalize(path)
+            adapter = self._storage_mounts.get(normalized)
+            if adapter is None:
+                raise InvalidOperation(f"No storage mount at {normalized}")
+            self._load_storage_mount(normalized, adapter)
+            self._rebuild_index()
+            return
+        # Parents first so a nested mount is re-applied after its enclosing mount.
+        mounts = sorted(self._storage_mounts.items(), key=lambda item: len(item[0].parts))
+        if not mounts:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(mounts), _MAX_SYNC_WORKERS)) as pool:
+            listings = [pool.submit(adapter.list) for _, adapter in mounts]
+            # Tree mutation stays on the calling thread; only adapter IO is overlapped.
+            for (prefix, _), listing in zip(mounts, listings, strict=True):
+                self._apply_storage_entries(prefix, listing.result())
         self._rebuild_index()
 
     def register_write_hook(self, prefix: str | PurePosixPath, hook: WriteHook) -> None:
         normalized = self._normalize(prefix)
-        self._write_hooks.append((normalized, hook))
+        self._write_hooks.add(normalized, hook)
 
     def register_path_hook(self, prefix: str | PurePosixPath, hook: PathHook) -> None:
         normalized = self._normalize(prefix)
-        self._path_hooks.append((normalized, hook))
+        self._path_hooks.add(normalized, hook)
 
     def set_policy(self, path: str | PurePosixPath, policy: NodePolicy) -> None:
         node = self._resolve_node(path)
         node.policy = policy
+        self._tree_epoch += 1
+
+    def find_by_classification(self, label: str) -> list[str]:
+        """Return the paths of every node whose policy carries ``label``.
+
+        Backed by an inverted index that is rebuilt on the first lookup after the
+        tree changes, so repeated lookups cost O(matches) rather than a full walk.
+        """
+        index = self._classification_index
+        if index is None or index[0] != self._tree_epoch:
+            buckets: dict[str, list[str]] = {}
+            skip = self._search_view_prefix
+            for path_str, node in self._walk_nodes(self.root):
+                if skip is not None and PurePosixPath(path_str).is_relative_to(skip):
+                    continue
+                buckets.setdefault(node.policy.classification, []).append(path_str)
+            index = self._classification_index = (self._tree_epoch, buckets)
+        return list(index[1].get(label, ()))
 
     def get_policy(self, path: str | PurePosixPath) -> NodePolicy:
         node = self._resolve_node(path)
@@ -949,33 +1533,43 @@ class VirtualFileSystem:
         *,
         view: VisibilityView | None = None,
     ) -> str:
-        root_dir = self._resolve_dir(path or self.cwd.path())
+        root_dir = self._resolve_dir(path or self.cwd.path_str())
         self._ensure_read_allowed(root_dir)
-        lines: list[str] = []
-
-        def render(directory: VirtualDirectory, prefix: str = "") -> None:
+        lines = [root_dir.path_str()]
+        append = lines.append
+        # Each stack entry is a pre-rendered line plus, for directories, the node
+        # and the prefix its own children will use.
+        stack: list[tuple[str, VirtualDirectory | None, str]] = []
+
+        def push(directory: VirtualDirectory, prefix: str) -> None:
+            # Decorate once so the sort key does not re-run isinstance per comparison.
             entries = sorted(
-                (
-                    child
-                    for child in directory.iter_children(self)
-                    if not view or view.allows_node(child)
-                ),
-                key=lambda node: (not isinstance(node, VirtualDirectory), node.name),
+                (not isinstance(child, VirtualDirectory), child.name, child)
+                for child in self._visible_children(directory, view)
             )
-            for idx, node in enumerate(entries):
-                connector = "└──" if idx == len(entries) - 1 else "├──"
-                if isinstance(node, VirtualDirectory):
-                    label = f"{prefix}{connector} {node.name}/"
-                else:
-                    label = f"{prefix}{connector} {node.name}"
-                lines.append(label)
-                if isinstance(node, VirtualDirectory):
-                    extension = "    " if idx == len(entries) - 1 else "│   "
-                    render(node, prefix + extension)
-
-        render(root_dir)
-        header = str(root_dir.path())
-        return "\n".join([header] + lines)
+            if not entries:
+                return
+            # Push in reverse so entries pop in sorted order; the final entry is
+            # handled on its own so the loop needs no per-item "is last" check.
+            *head, last = entries
+            push_entry(last[2], prefix, "└── ", "    ")
+            for _, _, child in reversed(head):
+                push_entry(child, prefix, "├── ", "│   ")
+
+        def push_entry(child: VirtualNode, prefix: str, connector: str, extension: str) -> None:
+            if isinstance(child, VirtualDirectory):
+                stack.append((f"{prefix}{connector}{child.name}/", child, prefix + extension))
+            else:
+                stack.append((f"{prefix}{connector}{child.name}", None, ""))
+
+        push(root_dir, "")
+        while stack:
+            line, directory, child_prefix = stack.pop()
+            append(line)
+            if directory is not None:
+                push(directory, child_prefix)
+
+        return "\n".join(lines)
 
 
 __all__ = ["VirtualFileSystem", "DirEntry"]
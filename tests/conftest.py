@@ -1,6 +1,41 @@
+import os
+import re
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+_SHM = Path("/dev/shm")
+
+
+@pytest.fixture(scope="session")
+def _memory_tmp_base():
+    """Per-worker scratch root on tmpfs, or ``None`` when unavailable."""
+    if not (sys.platform.startswith("linux") and os.access(_SHM, os.W_OK)):
+        yield None
+        return
+    base = Path(tempfile.mkdtemp(prefix="sandfs-tests-", dir=_SHM))
+    yield base
+    shutil.rmtree(base, ignore_errors=True)
+
+
+@pytest.fixture
+def tmp_path(request, tmp_path_factory, _memory_tmp_base):
+    """Keep export/adapter tests off the disk when ``/dev/shm`` is writable."""
+    name = re.sub(r"\W", "_", request.node.name)[:30]
+    if _memory_tmp_base is None:
+        return tmp_path_factory.mktemp(name)
+    return Path(tempfile.mkdtemp(prefix=f"{name}-", dir=_memory_tmp_base))
+
+
+@pytest.fixture(autouse=True)
+def _memory_materialize_base(monkeypatch, _memory_tmp_base):
+    """Point ``materialize()`` (and so ``host`` commands) at the tmpfs root too."""
+    if _memory_tmp_base is not None:
+        monkeypatch.setenv("SANDFS_MATERIALIZE_BASE", str(_memory_tmp_base))
@@ -122,3 +122,21 @@ def test_filesystem_adapter_delete_removes_file(tmp_path):
     assert not (root / "a.txt").exists()
     with pytest.raises(FileNotFoundError):
         adapter.read("a.txt")
+
+
+def test_sync_storage_keeps_nested_mounts():
+    outer = MemoryStorageAdapter(initial={"a.txt": "outer"})
+    inner = MemoryStorageAdapter(initial={"b.txt": "inner"})
+    vfs = VirtualFileSystem()
+    vfs.mount_storage("/m", outer)
+    vfs.mount_storage("/m/deep/sub", inner, policy=NodePolicy(classification="private"))
+
+    outer.write("c.txt", "added", version=0)
+    inner.write("d.txt", "added", version=0)
+    vfs.sync_storage()
+    vfs.sync_storage("/m")
+
+    assert vfs.read_file("/m/c.txt") == "added"
+    assert vfs.read_file("/m/deep/sub/b.txt") == "inner"
+    assert vfs.read_file("/m/deep/sub/d.txt") == "added"
+    assert vfs.get_policy("/m/deep/sub").classification == "private"
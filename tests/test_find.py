@@ -98,3 +98,10 @@ def test_find_respects_hidden_directories():
     assert "/" in lines
     assert "/hidden" not in lines
     assert "/hidden/visible.txt" not in lines
+
+
+def test_vfs_find_filters_by_name_and_type(shell):
+    vfs = shell.vfs
+    assert vfs.find("/", name_pattern="*.py") == ["/a/b/file2.py"]
+    assert vfs.find("/a", node_type="d") == ["/a", "/a/b"]
+    assert vfs.find("/a", name_pattern="FILE*") == []
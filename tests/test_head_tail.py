@@ -1,14 +1,26 @@
+from collections.abc import Iterator
+
 import pytest
 
 from sandfs import SandboxShell, VirtualFileSystem
+from sandfs.vfs import VFSSnapshot
 
+_LINES_TXT = "\n".join(f"line {i}" for i in range(1, 21))
 
-@pytest.fixture
-def shell() -> SandboxShell:
+
+@pytest.fixture(scope="module")
+def _shell_and_baseline() -> tuple[SandboxShell, VFSSnapshot]:
     vfs = VirtualFileSystem()
-    content = "\n".join([f"line {i}" for i in range(1, 21)])
-    vfs.write_file("/lines.txt", content)
-    return SandboxShell(vfs)
+    vfs.write_file("/lines.txt", _LINES_TXT)
+    return SandboxShell(vfs), vfs.snapshot()
+
+
+@pytest.fixture
+def shell(_shell_and_baseline) -> Iterator[SandboxShell]:
+    # Build the VFS once per module and roll back whatever a test wrote.
+    shell, baseline = _shell_and_baseline
+    yield shell
+    shell.vfs.restore(baseline)
 
 
 def test_head_default(shell):
@@ -72,3 +84,14 @@ def test_tail_preserves_whitespace(shell):
     result = shell.exec("tail /whitespace.txt")
     assert result.exit_code == 0
     assert result.stdout == "\nfoo\n"
+
+
+def test_tail_line_offsets_follow_writes(shell):
+    content = "one\ntwo\r\nthree\rfour"
+    shell.vfs.write_file("/mixed.txt", content)
+    for count in (0, 1, 2, 3, 10, -1):
+        expected = "".join(content.splitlines(keepends=True)[-count:])
+        assert shell.vfs.read_tail_lines("/mixed.txt", count) == expected
+
+    shell.vfs.append_file("/mixed.txt", "\nfive\n")
+    assert shell.exec("tail -n 2 /mixed.txt").stdout == "four\nfive\n"
@@ -1,15 +1,30 @@
+from collections.abc import Iterator
+
+import pytest
+
 from sandfs import VirtualFileSystem
 from sandfs.integrations import PathEvent
+from sandfs.vfs import VFSSnapshot
 
 
-def test_path_hook_receives_create_update_delete():
+@pytest.fixture(scope="module")
+def _baseline() -> tuple[VirtualFileSystem, list[PathEvent], VFSSnapshot]:
     vfs = VirtualFileSystem()
     events: list[PathEvent] = []
+    vfs.register_path_hook("/blue/inbox", events.append)
+    return vfs, events, vfs.snapshot()
+
 
-    def handler(event: PathEvent) -> None:
-        events.append(event)
+@pytest.fixture
+def hooked(_baseline) -> Iterator[tuple[VirtualFileSystem, list[PathEvent]]]:
+    vfs, events, snapshot = _baseline
+    yield vfs, events
+    vfs.restore(snapshot)
+    events.clear()
 
-    vfs.register_path_hook("/blue/inbox", handler)
+
+def test_path_hook_receives_create_update_delete(hooked):
+    vfs, events = hooked
 
     vfs.write_file("/blue/inbox/note.txt", "hello")
     vfs.write_file("/blue/inbox/note.txt", "world")
@@ -19,3 +34,15 @@ def test_path_hook_receives_create_update_delete():
     assert events[0].content == "hello"
     assert events[1].content == "world"
     assert events[2].content is None
+
+
+def test_path_hooks_stay_registered_across_restore(hooked):
+    vfs, events = hooked
+    vfs.write_file("/blue/inbox/note.txt", "hello")
+    vfs.restore(vfs.snapshot())
+    events.clear()
+
+    vfs.write_file("/blue/inbox/note.txt", "again")
+    vfs.write_file("/elsewhere.txt", "ignored")
+
+    assert [(e.event, e.content) for e in events] == [("update", "again")]
@@ -0,0 +1,44 @@
+from pathlib import PurePosixPath
+
+from sandfs.pathtrie import PathTrie
+
+
+def test_matches_returns_values_in_registration_order():
+    trie: PathTrie[str] = PathTrie()
+    trie.add(PurePosixPath("/a/b"), "deep")
+    trie.add(PurePosixPath("/"), "root")
+    trie.add(PurePosixPath("/a"), "mid")
+    trie.add(PurePosixPath("/other"), "other")
+
+    assert trie.matches(PurePosixPath("/a/b/c.txt")) == ["deep", "root", "mid"]
+    assert trie.matches(PurePosixPath("/ab")) == ["root"]
+    assert len(trie) == 4
+
+
+def test_longest_picks_most_specific_prefix():
+    trie: PathTrie[str] = PathTrie()
+    trie.set(PurePosixPath("/data"), "outer")
+    trie.set(PurePosixPath("/data/nested"), "inner")
+    trie.set(PurePosixPath("/data"), "replaced")
+
+    assert trie.longest(PurePosixPath("/data/nested/x.txt")) == (
+        PurePosixPath("/data/nested"),
+        "inner",
+    )
+    assert trie.longest(PurePosixPath("/data/y.txt")) == (PurePosixPath("/data"), "replaced")
+    assert trie.longest(PurePosixPath("/elsewhere")) is None
+    assert len(trie) == 2
+
+
+def test_overlaps_covers_descendants_and_ancestors():
+    trie: PathTrie[None] = PathTrie()
+    assert not trie.overlaps(PurePosixPath("/"))
+    trie.add(PurePosixPath("/blue/inbox"), None)
+    trie.add(PurePosixPath("/docs"), None)
+
+    assert trie.overlaps(PurePosixPath("/"))
+    assert trie.overlaps(PurePosixPath("/blue"))
+    assert trie.overlaps(PurePosixPath("/blue/inbox/note.txt"))
+    assert trie.overlaps(PurePosixPath("/docs/a/b.md"))
+    assert not trie.overlaps(PurePosixPath("/blue/outbox"))
+    assert not trie.overlaps(PurePosixPath("/docsx"))
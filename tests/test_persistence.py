@@ -1,6 +1,6 @@
 import pytest
 
-from sandfs import VirtualFileSystem
+from sandfs import MemoryStorageAdapter, VirtualFileSystem
 from sandfs.exceptions import InvalidOperation
 from sandfs.hooks import WriteEvent
 
@@ -30,3 +30,42 @@ def test_write_hooks_receive_events():
     assert events[0].version == 1
     assert events[1].append is True
     assert "beta" in events[1].content
+
+
+def test_batch_defers_storage_and_hooks_until_exit():
+    vfs = VirtualFileSystem()
+    adapter = MemoryStorageAdapter()
+    vfs.mount_storage("/data", adapter)
+    events: list[WriteEvent] = []
+    vfs.register_write_hook("/data", events.append)
+
+    with vfs.batch():
+        vfs.write_file("/data/a.txt", "one")
+        vfs.write_file("/data/a.txt", "two")
+        vfs.write_file("/data/b.txt", "gone")
+        vfs.remove("/data/b.txt")
+        assert vfs.read_file("/data/a.txt") == "two"
+        assert adapter.list() == {}
+        assert events == []
+
+    assert adapter.list()["a.txt"].content == "two"
+    assert "b.txt" not in adapter.list()
+    assert [(event.path, event.content) for event in events] == [
+        ("/data/a.txt", "one"),
+        ("/data/a.txt", "two"),
+        ("/data/b.txt", "gone"),
+    ]
+
+
+def test_batch_writes_share_one_clock_reading():
+    vfs = VirtualFileSystem()
+    ticks = iter([100.0, 200.0, 300.0])
+    vfs._clock = lambda: next(ticks)
+
+    with vfs.batch():
+        first = vfs.write_file("/a.txt", "a")
+        second = vfs.write_file("/b.txt", "b")
+    third = vfs.write_file("/c.txt", "c")
+
+    assert first.modified_at == second.modified_at == 100.0
+    assert third.modified_at == 200.0
@@ -1,7 +1,11 @@
+import sys
+from dataclasses import FrozenInstanceError, replace
+
 import pytest
 
-from sandfs import SandboxShell, VirtualFileSystem
+from sandfs import SandboxShell, VirtualFileSystem, policies
 from sandfs.exceptions import InvalidOperation
+from sandfs.nodes import VirtualDirectory
 from sandfs.policies import NodePolicy, VisibilityView
 
 
@@ -23,6 +27,35 @@ def test_append_only_policy_allows_appends():
     assert "next" in vfs.read_file("/logs/run.txt")
 
 
+def test_policies_are_replaced_not_mutated():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/notes.txt", "draft")
+    policy = vfs.get_policy("/notes.txt")
+    with pytest.raises(FrozenInstanceError):
+        policy.writable = False
+
+    vfs.set_policy("/notes.txt", replace(policy, writable=False))
+    with pytest.raises(InvalidOperation):
+        vfs.write_file("/notes.txt", "edit")
+
+    vfs.set_policy("/notes.txt", policy)
+    vfs.write_file("/notes.txt", "edit")
+    assert vfs.read_file("/notes.txt") == "edit"
+
+
+def test_view_label_checks_follow_replaced_policies():
+    view = VisibilityView(classifications={"public"}, principals={"alice"})
+    policy = NodePolicy(classification="private")
+    assert not view.allows(policy)
+    assert view.allows(replace(policy, classification="public"))
+
+    assert not view.allows(replace(policy, principals={"bob"}))
+    shared = replace(policy, principals={"bob", "alice"})
+    assert view.allows(shared)
+    assert shared.principals == frozenset({"bob", "alice"})
+    assert not VisibilityView(classifications={"public"}).allows(shared)
+
+
 def test_visibility_view_hides_nodes_from_shell():
     vfs = VirtualFileSystem()
     vfs.write_file("/blue/public.txt", "public")
@@ -35,3 +68,49 @@ def test_visibility_view_hides_nodes_from_shell():
     hidden = shell.exec("cat /blue/private.txt")
     assert hidden.exit_code == 1
     assert "hidden" in hidden.stderr.lower()
+
+
+def test_policy_labels_are_interned_and_accept_str_subclasses():
+    class Label(str):
+        pass
+
+    built = "".join(["sec", "ret"])
+    policy = NodePolicy(classification=built, principals={"".join(["al", "ice"])})
+    assert policy.classification is sys.intern("secret")
+    assert next(iter(policy.principals)) is sys.intern("alice")
+
+    custom = NodePolicy(classification=Label("secret"))
+    assert VisibilityView(classifications={"secret"}).allows(custom)
+
+
+def test_str_subclass_node_names_are_accepted():
+    class Name(str):
+        pass
+
+    vfs = VirtualFileSystem()
+    vfs.write_file(Name("/docs/a.txt"), "a")
+    vfs.root.add_child(VirtualDirectory(name=Name("custom")))
+    assert vfs.read_file("/docs/a.txt") == "a"
+    assert sorted(vfs.get_node("/").children) == ["custom", "docs"]
+
+
+def test_label_registry_overflow_falls_back_to_label_sets(monkeypatch):
+    monkeypatch.setattr(policies, "_MAX_LABEL_BITS", len(policies._LABEL_BITS))
+    registered = len(policies._LABEL_BITS)
+    carol = NodePolicy(principals={"overflow-carol"})
+    dave = NodePolicy(principals={"overflow-dave"})
+    secret = NodePolicy(classification="overflow-secret")
+    assert len(policies._LABEL_BITS) == registered
+
+    view = VisibilityView(classifications={"overflow-other"}, principals={"overflow-carol"})
+    assert view.allows(carol)
+    assert not view.allows(dave)
+    assert not view.allows(secret)
+    assert VisibilityView(classifications={"overflow-secret"}).allows(secret)
+
+    vfs = VirtualFileSystem()
+    for name, policy in {"carol": carol, "dave": dave, "secret": secret}.items():
+        vfs.write_file(f"/o/{name}", name)
+        vfs.set_policy(f"/o/{name}", policy)
+    nodes = [vfs.get_node(f"/o/{name}") for name in ("carol", "dave", "secret")]
+    assert [node.name for node in view._allowed_nodes(nodes)] == ["carol"]
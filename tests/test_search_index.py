@@ -45,6 +45,24 @@ def test_full_text_index_search_options():
     assert {result.path for result in readded} == {PurePosixPath("/notes/b.txt")}
 
 
+def test_full_text_index_literal_prefilter_tracks_edits():
+    index = FullTextIndex()
+    path = PurePosixPath("/notes/a.txt")
+    index.index_file(path, "alpha beta\n")
+    index.index_file(PurePosixPath("/notes/b.txt"), "gamma\n")
+
+    assert [r.path for r in index.search(SearchQuery(query="beta"))] == [path]
+    assert [r.path for r in index.search(SearchQuery(query="BETA", ignore_case=True))] == [path]
+    assert index.search(SearchQuery(query="BETA")) == []
+
+    index.index_file(path, "delta\n")
+    assert index.search(SearchQuery(query="beta")) == []
+    assert [r.line_text for r in index.search(SearchQuery(query="delta"))] == ["delta"]
+
+    index.index_file(path, "Ölçü straße\n")
+    assert [r.path for r in index.search(SearchQuery(query="straße"))] == [path]
+
+
 def test_vfs_search_index_updates_on_move_copy_remove():
     vfs = VirtualFileSystem()
     vfs.enable_full_text_index()
@@ -1,20 +1,37 @@
+from collections.abc import Iterator
+
+import pytest
+
 from sandfs import SandboxShell, VirtualFileSystem
+from sandfs.vfs import VFSSnapshot
 
 
-def test_search_command():
+# Every test runs against both the plain scan and the full-text index.
+@pytest.fixture(scope="module", params=[False, True], ids=["scan", "indexed"])
+def _baseline(request) -> tuple[SandboxShell, VFSSnapshot]:
     vfs = VirtualFileSystem()
     vfs.write_file("/workspace/README.md", "hello world\n")
-    shell = SandboxShell(vfs)
+    if request.param:
+        vfs.enable_full_text_index()
+    vfs.enable_search_view()
+    return SandboxShell(vfs), vfs.snapshot()
+
+
+@pytest.fixture
+def shell(_baseline) -> Iterator[SandboxShell]:
+    shell, snapshot = _baseline
+    yield shell
+    shell.vfs.restore(snapshot)
+    # Snapshots do not capture directory loaders, so remount the search view.
+    shell.vfs.enable_search_view()
+
+
+def test_search_command(shell):
     res = shell.exec("search hello /workspace")
     assert "/workspace/README.md" in res.stdout
 
 
-def test_search_view_tree_and_content():
-    vfs = VirtualFileSystem()
-    vfs.write_file("/workspace/README.md", "hello world\n")
-    vfs.enable_search_view()
-    shell = SandboxShell(vfs)
-
+def test_search_view_tree_and_content(shell):
     res = shell.exec("ls /@search?q=hello")
     assert "workspace" in res.stdout
 
@@ -22,11 +39,8 @@ def test_search_view_tree_and_content():
     assert "/workspace/README.md:1:hello world" in res2.stdout
 
 
-def test_search_view_query_params_with_path_prefix():
-    vfs = VirtualFileSystem()
-    vfs.write_file("/workspace/README.md", "Hello World\n")
-    vfs.enable_search_view()
-    shell = SandboxShell(vfs)
+def test_search_view_query_params_with_path_prefix(shell):
+    shell.vfs.write_file("/workspace/README.md", "Hello World\n")
 
     res = shell.exec("ls /@search?q=hello&ignore_case=1&path=/workspace")
     assert "workspace" in res.stdout
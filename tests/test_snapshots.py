@@ -1,11 +1,20 @@
-from sandfs import MemoryStorageAdapter, VirtualFileSystem
+import os
+
+import pytest
+
+from sandfs import MemoryStorageAdapter, NodePolicy, VirtualFileSystem
+from sandfs.vfs import VFSSnapshot
 
 
 def test_export_to_path_writes_expected_tree(tmp_path):
     vfs = VirtualFileSystem()
-    vfs.write_file("/root.txt", "root")
-    vfs.write_file("/docs/readme.md", "readme contents")
-    vfs.write_file("/docs/nested/info.txt", "info")
+    vfs.populate(
+        {
+            "/root.txt": "root",
+            "/docs/readme.md": "readme contents",
+            "/docs/nested/info.txt": "info",
+        }
+    )
 
     export_dir = tmp_path / "export"
     vfs.export_to_path(export_dir)
@@ -26,6 +35,16 @@ def test_materialize_context_cleans_up_temp_dir():
     assert not root.exists()
 
 
+def test_materialize_honours_base_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("SANDFS_MATERIALIZE_BASE", str(tmp_path))
+    vfs = VirtualFileSystem()
+    vfs.write_file("/note.txt", "data")
+
+    with vfs.materialize() as root:
+        assert root.parent == tmp_path
+        assert (root / "note.txt").read_text() == "data"
+
+
 def test_snapshot_restore_in_memory():
     vfs = VirtualFileSystem()
     vfs.write_file("/notes/a.txt", "hello")
@@ -35,9 +54,26 @@ def test_snapshot_restore_in_memory():
     vfs.write_file("/notes/a.txt", "boom")
     vfs.remove("/notes/b.txt")
 
+    vfs.cd("/notes")
+    stale = vfs.get_node("/notes/a.txt")
     vfs.restore(snap)
     assert vfs.read_file("/notes/a.txt") == "hello"
     assert vfs.read_file("/notes/b.txt") == "world"
+    # Lookups after a restore resolve against the new tree, not cached old nodes.
+    assert vfs.get_node("/notes/a.txt") is not stale
+    assert vfs.get_node("/notes/a.txt").parent is vfs.get_node("/notes")
+
+
+def test_restore_rebuilds_children_of_read_only_directories():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/locked/sub/data.txt", "kept")
+    vfs.set_policy("/locked", NodePolicy(writable=False))
+
+    snap = vfs.snapshot()
+    vfs.restore(snap)
+
+    assert vfs.read_file("/locked/sub/data.txt") == "kept"
+    assert vfs.get_policy("/locked").writable is False
 
 
 def test_snapshot_restore_with_storage_mount():
@@ -53,3 +89,96 @@ def test_snapshot_restore_with_storage_mount():
     assert vfs.read_file("/data/a.txt") == "hello"
     vfs.sync_storage("/data")
     assert vfs.read_file("/data/a.txt") == "external"
+
+
+def test_sync_storage_without_path_refreshes_every_mount():
+    first = MemoryStorageAdapter(initial={"a.txt": "one"})
+    second = MemoryStorageAdapter(initial={"b.txt": "two"})
+    vfs = VirtualFileSystem()
+    vfs.mount_storage("/first", first)
+    vfs.mount_storage("/second", second)
+    snap = vfs.snapshot()
+
+    first.write("a.txt", "one-external", version=first.read("a.txt").version)
+    second.write("c.txt", "new", version=0)
+
+    vfs.restore(snap)
+    vfs.sync_storage()
+    assert vfs.read_file("/first/a.txt") == "one-external"
+    assert vfs.read_file("/second/b.txt") == "two"
+    assert vfs.read_file("/second/c.txt") == "new"
+
+
+def test_restore_delta_only_touches_changed_nodes():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/notes/a.txt", "hello")
+    vfs.write_file("/notes/b.txt", "world")
+    vfs.write_file("/keep/c.txt", "same")
+    snap = vfs.snapshot()
+    untouched = vfs.get_node("/keep/c.txt")
+
+    vfs.write_file("/notes/a.txt", "boom")
+    vfs.remove("/notes/b.txt")
+    vfs.write_file("/notes/extra.txt", "added")
+    vfs.remove("/keep/c.txt")
+    vfs.mkdir("/keep/c.txt")
+
+    vfs.restore_delta(snap)
+    assert vfs.read_file("/notes/a.txt") == "hello"
+    assert vfs.get_version("/notes/a.txt") == 1
+    assert vfs.read_file("/notes/b.txt") == "world"
+    assert not vfs.exists("/notes/extra.txt")
+    assert vfs.is_file("/keep/c.txt")
+    assert vfs.read_file("/keep/c.txt") == "same"
+    assert vfs.get_node("/keep/c.txt") is not untouched
+
+    stable = vfs.get_node("/notes/b.txt")
+    vfs.restore_delta(snap)
+    assert vfs.get_node("/notes/b.txt") is stable
+
+
+@pytest.mark.parametrize("method", ["restore", "restore_delta"])
+def test_restore_accepts_snapshots_without_parent_entries(method):
+    source = VirtualFileSystem()
+    source.write_file("/a/b/c.txt", "deep")
+    full = source.snapshot()
+    nodes = {path: state for path, state in full.nodes.items() if path not in ("/a", "/a/b")}
+    sparse = VFSSnapshot(nodes=nodes, cwd=full.cwd, storage_mounts=full.storage_mounts)
+
+    vfs = VirtualFileSystem()
+    vfs.write_file("/other.txt", "gone")
+    getattr(vfs, method)(sparse)
+    assert vfs.read_file("/a/b/c.txt") == "deep"
+    assert vfs.is_dir("/a/b")
+    assert not vfs.exists("/other.txt")
+
+
+def test_export_to_path_skips_unchanged_files(tmp_path):
+    vfs = VirtualFileSystem()
+    vfs.write_file("/same.txt", "same")
+    vfs.write_file("/docs/changed.txt", "before")
+    export_dir = tmp_path / "export"
+    vfs.export_to_path(export_dir)
+
+    stale = 1_000_000_000
+    for name in ("same.txt", "docs/changed.txt"):
+        os.utime(export_dir / name, ns=(stale, stale))
+
+    vfs.write_file("/docs/changed.txt", "after")
+    vfs.export_to_path(export_dir)
+
+    assert (export_dir / "same.txt").stat().st_mtime_ns == stale
+    assert (export_dir / "docs" / "changed.txt").read_text() == "after"
+
+
+def test_export_to_path_writes_large_trees(tmp_path):
+    vfs = VirtualFileSystem()
+    for idx in range(80):
+        vfs.write_file(f"/bulk/dir{idx % 5}/file{idx}.txt", f"payload {idx}")
+
+    export_dir = tmp_path / "export"
+    vfs.export_to_path(export_dir)
+
+    written = sorted(export_dir.rglob("*.txt"))
+    assert len(written) == 80
+    assert (export_dir / "bulk" / "dir3" / "file13.txt").read_text() == "payload 13"
@@ -1,4 +1,4 @@
-import time
+import itertools
 
 import pytest
 
@@ -7,7 +7,11 @@ from sandfs import SandboxShell, VirtualFileSystem
 
 @pytest.fixture
 def vfs() -> VirtualFileSystem:
-    return VirtualFileSystem()
+    vfs = VirtualFileSystem()
+    # Every timestamp read advances by one second, so no test needs to sleep.
+    ticks = itertools.count(1000.0)
+    vfs._clock = lambda: next(ticks)
+    return vfs
 
 
 @pytest.fixture
@@ -42,7 +46,6 @@ def test_timestamps_update_on_write(vfs: VirtualFileSystem) -> None:
     created_at = node.created_at
     modified_at = node.modified_at
 
-    time.sleep(0.1)
     vfs.write_file("/test.txt", "updated")
 
     node = vfs.get_node("/test.txt")
@@ -55,8 +58,31 @@ def test_timestamps_update_on_touch(vfs: VirtualFileSystem) -> None:
     node = vfs.get_node("/test.txt")
     modified_at = node.modified_at
 
-    time.sleep(0.1)
     vfs.touch("/test.txt")
 
     node = vfs.get_node("/test.txt")
     assert node.modified_at > modified_at
+
+
+def test_created_at_follows_vfs_clock(vfs: VirtualFileSystem) -> None:
+    with vfs.batch():
+        vfs.write_file("/batch/a.txt", "a")
+    node = vfs.get_node("/batch/a.txt")
+    assert node.created_at == node.modified_at < 2000
+    assert vfs.get_node("/batch").created_at < 2000
+
+    vfs.mkdir("/dir")
+    vfs.copy("/batch/a.txt", "/dir/b.txt")
+    copied = vfs.get_node("/dir/b.txt")
+    assert vfs.get_node("/dir").created_at < copied.created_at <= copied.modified_at
+
+
+def test_batch_reads_the_clock_once() -> None:
+    vfs = VirtualFileSystem()
+    readings: list[float] = []
+    vfs._clock = lambda: readings.append(5.0) or 5.0
+    with vfs.batch():
+        for idx in range(3):
+            vfs.write_file(f"/batch/{idx}/file.txt", "x")
+    assert readings == [5.0]
+    assert vfs.get_node("/batch/2/file.txt").created_at == 5.0
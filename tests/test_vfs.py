@@ -1,4 +1,8 @@
-from sandfs import VirtualFileSystem
+import pytest
+
+from sandfs import NodePolicy, VirtualFileSystem
+from sandfs.exceptions import InvalidOperation
+from sandfs.nodes import VirtualFile, VirtualNode
 from sandfs.providers import ProvidedNode
 
 
@@ -48,10 +52,14 @@ def test_tree_representation(tmp_path):
 
 def test_iter_files_handles_recursion_and_file_targets():
     vfs = VirtualFileSystem()
-    vfs.write_file("/path/alpha.txt", "alpha")
-    vfs.write_file("/path/beta/b-one.txt", "one")
-    vfs.write_file("/path/beta/gamma/deep.txt", "deep")
-    vfs.write_file("/path/omega.txt", "omega")
+    vfs.populate(
+        {
+            "/path/alpha.txt": "alpha",
+            "/path/beta/b-one.txt": "one",
+            "/path/beta/gamma/deep.txt": "deep",
+            "/path/omega.txt": "omega",
+        }
+    )
 
     direct_children = list(vfs.iter_files("/path", recursive=False))
     assert [str(path) for path, _ in direct_children] == [
@@ -71,3 +79,125 @@ def test_iter_files_handles_recursion_and_file_targets():
     assert [str(path) for path, _ in file_target] == [
         "/path/beta/b-one.txt",
     ]
+
+
+def test_resolve_accepts_non_canonical_absolute_paths():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/a/b/c.txt", "data")
+    node = vfs.get_node("/a/b/c.txt")
+
+    for variant in ("/a//b/c.txt", "/a/./b/c.txt", "/a/x/../b/c.txt", "/a/b/"):
+        resolved = vfs.get_node(variant)
+        if variant.endswith("/"):
+            assert resolved is node.parent
+        else:
+            assert resolved is node
+    assert vfs.get_node("/") is vfs.root
+    assert not vfs.exists("/a/b/c.txt/d")
+
+
+def test_cached_lookups_follow_moves_and_removals():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/a/b/c.txt", "data")
+    node = vfs.get_node("/a/b/c.txt")
+    assert vfs.get_node("/a/b/c.txt") is node
+
+    vfs.move("/a/b", "/a/moved")
+    assert not vfs.exists("/a/b/c.txt")
+    assert vfs.get_node("/a/moved/c.txt") is node
+
+    vfs.remove("/a/moved", recursive=True)
+    assert not vfs.exists("/a/moved/c.txt")
+    vfs.write_file("/a/moved/c.txt", "new")
+    assert vfs.get_node("/a/moved/c.txt") is not node
+
+
+def test_recursive_copy_is_independent_of_source():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/src/a/b/leaf.txt", "original")
+    vfs.get_node("/src/a").metadata["tag"] = "x"
+
+    vfs.copy("/src", "/dst", recursive=True)
+    vfs.write_file("/dst/a/b/leaf.txt", "changed")
+    vfs.write_file("/dst/a/extra.txt", "new")
+    vfs.get_node("/dst/a").metadata["tag"] = "y"
+
+    assert vfs.read_file("/src/a/b/leaf.txt") == "original"
+    assert not vfs.exists("/src/a/extra.txt")
+    assert vfs.get_node("/src/a").metadata == {"tag": "x"}
+    assert str(vfs.get_node("/dst/a/b/leaf.txt").path()) == "/dst/a/b/leaf.txt"
+
+
+def test_recursive_remove_checks_whole_subtree_first():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/proj/a.txt", "a")
+    vfs.write_file("/proj/nested/locked.txt", "keep")
+    vfs.set_policy("/proj/nested/locked.txt", NodePolicy(writable=False))
+
+    with pytest.raises(InvalidOperation):
+        vfs.remove("/proj", recursive=True)
+    assert vfs.read_file("/proj/a.txt") == "a"
+
+    vfs.set_policy("/proj/nested/locked.txt", NodePolicy())
+    events: list[str] = []
+    vfs.register_path_hook("/", lambda event: events.append(f"{event.event}:{event.path}"))
+    vfs.remove("/proj", recursive=True)
+
+    assert not vfs.exists("/proj")
+    assert events == ["delete:/proj/a.txt", "delete:/proj/nested/locked.txt"]
+
+
+def test_bare_names_are_created_in_cwd():
+    vfs = VirtualFileSystem()
+    vfs.mkdir("/work")
+    vfs.cd("/work")
+
+    vfs.mkdir("sub")
+    vfs.write_file("note.txt", "hi")
+
+    assert vfs.is_dir("/work/sub")
+    assert vfs.read_file("/work/note.txt") == "hi"
+    assert vfs.read_file("note.txt") == "hi"
+
+
+def test_bare_names_recreate_a_removed_cwd():
+    vfs = VirtualFileSystem()
+    vfs.mkdir("/a/b", parents=True)
+    vfs.cd("/a/b")
+    vfs.remove("/a", recursive=True)
+
+    vfs.write_file("x.txt", "hi")
+    assert vfs.read_file("/a/b/x.txt") == "hi"
+
+
+def test_populate_writes_files_and_reuses_parents():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/docs/existing.txt", "v1")
+
+    written = vfs.populate({"/docs/existing.txt": "v2", "/docs/new.txt": "new", "top.txt": "top"})
+
+    assert [node.path_str() for node in written] == [
+        "/docs/existing.txt",
+        "/docs/new.txt",
+        "/top.txt",
+    ]
+    assert vfs.read_file("/docs/existing.txt") == "v2"
+    assert vfs.get_version("/docs/existing.txt") == 2
+    assert vfs.read_file("/docs/new.txt") == "new"
+
+
+def test_node_metadata_is_allocated_on_first_use():
+    vfs = VirtualFileSystem()
+    node = vfs.write_file("/notes/a.txt", "a")
+    snapshot = vfs.snapshot()
+    assert vfs.ls("/notes")[0].metadata == {}
+    assert node._metadata is None
+
+    node.metadata["tag"] = "keep"
+    # Once a node has metadata, its listing entry aliases the node's dict.
+    assert vfs.ls("/notes")[0].metadata is node.metadata
+    assert VirtualFile("b.txt", metadata={"tag": "x"}).metadata == {"tag": "x"}
+    assert VirtualNode("c", metadata={"tag": "y"}).metadata == {"tag": "y"}
+
+    vfs.restore(snapshot)
+    assert vfs.get_node("/notes/a.txt").metadata == {}
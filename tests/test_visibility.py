@@ -80,3 +80,70 @@ def test_metadata_filters_do_not_bypass_classification_for_dirs():
     res = shell.exec("ls /secret")
     assert res.exit_code == 1
     assert "hidden" in res.stderr.lower()
+
+
+def test_iter_visible_children_applies_prefixes_policy_and_metadata():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/blue/inbox/a.txt", "a")
+    vfs.write_file("/blue/outbox/b.txt", "b")
+    vfs.write_file("/blue/inbox/secret.txt", "s")
+    vfs.set_policy("/blue/inbox/secret.txt", NodePolicy(classification="private"))
+    view = VisibilityView(classifications={"public"}, path_prefixes={"/blue/inbox"})
+
+    assert [name for name, _ in vfs.iter_visible_children("/blue", view)] == ["inbox"]
+    assert [name for name, _ in vfs.iter_visible_children("/blue/inbox", view)] == ["a.txt"]
+    assert [name for name, _ in vfs.iter_visible_children("/blue")] == ["inbox", "outbox"]
+
+
+def test_metadata_filters_reject_sparse_nodes_and_match_none():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/blue/bare.txt", "bare")
+    vfs.write_file("/blue/tagged.txt", "tagged")
+    vfs.get_node("/blue/tagged.txt").metadata.update({"tag": "keep", "owner": "ann"})
+
+    view = VisibilityView(metadata_filters={"tag": "keep", "owner": "ann"})
+    assert not view.allows_node(vfs.get_node("/blue/bare.txt"))
+    assert view.allows_node(vfs.get_node("/blue/tagged.txt"))
+
+    # A None filter value matches nodes that lack the key entirely.
+    untagged = VisibilityView(metadata_filters={"tag": None})
+    assert untagged.allows_node(vfs.get_node("/blue/bare.txt"))
+    assert not untagged.allows_node(vfs.get_node("/blue/tagged.txt"))
+
+
+def test_batched_policy_filter_matches_allows():
+    vfs = VirtualFileSystem()
+    policies = [
+        NodePolicy(),
+        NodePolicy(classification="private"),
+        NodePolicy(classification="private", principals={"bob"}),
+        NodePolicy(principals={"alice"}),
+    ]
+    for idx, policy in enumerate(policies):
+        vfs.write_file(f"/d/{idx}.txt", "x")
+        vfs.set_policy(f"/d/{idx}.txt", policy)
+    nodes = [vfs.get_node(f"/d/{idx}.txt") for idx in range(len(policies))]
+    views = [
+        VisibilityView(),
+        VisibilityView(classifications={"public"}),
+        VisibilityView(principals={"bob"}),
+        VisibilityView(classifications={"private"}, principals=()),
+    ]
+    for view in views:
+        expected = [node for node in nodes if view.allows(node.policy)]
+        assert list(view._allowed_nodes(nodes)) == expected
+
+
+def test_find_by_classification_tracks_policy_and_tree_changes():
+    vfs = VirtualFileSystem()
+    vfs.write_file("/blue/a.txt", "a")
+    vfs.write_file("/blue/secret.txt", "s")
+    vfs.set_policy("/blue/secret.txt", NodePolicy(classification="private"))
+    assert vfs.find_by_classification("private") == ["/blue/secret.txt"]
+
+    vfs.set_policy("/blue/a.txt", NodePolicy(classification="private"))
+    vfs.write_file("/blue/new.txt", "n")
+    vfs.remove("/blue/secret.txt")
+    assert vfs.find_by_classification("private") == ["/blue/a.txt"]
+    assert vfs.find_by_classification("public") == ["/", "/blue", "/blue/new.txt"]
+    assert vfs.find_by_classification("missing") == []